@@ -1,14 +1,22 @@
+import asyncio
 import bcrypt
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from jose import jwt
 from datetime import datetime, timedelta
-import os
+
+from app.metrics import metrics, span
+from app.settings import settings
 
 # --- Password hashing and verification ---
 
-def hash_password(password: str) -> str:
-    """Hashes a plain text password using bcrypt.
+def hash_password(password: str, rounds: int = None) -> str:
+    """Hashes a plain text password using bcrypt (cost BCRYPT_ROUNDS by default).
     Returns the hashed password as a string."""
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    rounds = rounds or settings.bcrypt_rounds
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)).decode()
 
 def verify_password(password: str, hashed: str) -> bool:
     """
@@ -17,16 +25,155 @@ def verify_password(password: str, hashed: str) -> bool:
     """
     return bcrypt.checkpw(password.encode(), hashed.encode())
 
-# --- JWT encoding/decoding (optional, for advanced use) ---
+def needs_rehash(hashed: str) -> bool:
+    """True if a bcrypt hash ("$2b$<cost>$...") was made with a cost other than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed.split("$")[2]) != settings.bcrypt_rounds
+    except (IndexError, ValueError):
+        return False
+
+# --- Password hashing executor ---
+# bcrypt costs 100-300 ms of CPU per call. It runs on a small dedicated thread
+# pool (bcrypt releases the GIL), so a login storm cannot take over the
+# threadpool shared with the rest of the app. Calls beyond the queue limit are
+# refused immediately instead of waiting behind seconds of queued hashes.
+
+class PasswordHasherBusy(Exception):
+    """The hashing queue is full; the caller should retry later."""
+
+class PasswordHasher:
+    def __init__(self, workers=4, max_queue=64):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0   # queued + running
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+    async def _run(self, stage, func, *args):
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy("Too many password operations in progress")
+        self.pending += 1
+        try:
+            with span(stage):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, _timed, stage, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password):
+        return await self._run("password.hash", hash_password, password)
+
+    async def verify(self, password, hashed):
+        return await self._run("password.verify", verify_password, password, hashed)
+
+    def stats(self):
+        return {"workers": self.workers, "max_queue": self.max_queue, "pending": self.pending, "rejected": self.rejected}
 
-def create_access_token(data: dict, expires_delta: int = 60*24):
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+def _timed(stage, func, *args):
+    """Run `func` in a worker, recording its CPU time apart from the queue wait."""
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        metrics.observe("password_hash_seconds", time.perf_counter() - started, operation=stage.split(".")[1])
+
+metrics.describe("password_hash_seconds", "bcrypt time per operation, excluding the executor queue.")
+
+# --- Admission control ---
+
+class TooManyAttempts(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Too many attempts")
+        self.retry_after = retry_after
+
+class AttemptLimiter:
+    """
+    Token bucket per key (e.g. "ip:1.2.3.4", "user:42"): `burst` attempts
+    at once, refilled at `per_minute` per minute. Checked before any hashing,
+    so rejected attempts cost no CPU. Holds at most `max_keys` buckets.
+
+    admit() takes an attempt up front (per client); check() and charge() let
+    a bucket be spent only on failures (per account, so nobody can lock out
+    an account without getting its password wrong).
+    """
+
+    def __init__(self, per_minute=10, burst=5, max_keys=100000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+
+    def admit(self, *keys):
+        """Take one attempt from every key's bucket, or raise TooManyAttempts (taking none)."""
+        now = time.monotonic()
+        levels = self._check(keys, now)
+        for key, tokens in levels:
+            self._spend(key, tokens, now)
+
+    def check(self, *keys):
+        """Raise TooManyAttempts if any key's bucket is empty, without taking an attempt."""
+        self._check(keys, time.monotonic())
+
+    def charge(self, *keys):
+        """Take one attempt from every key's bucket (after a failure); never raises."""
+        now = time.monotonic()
+        for key in keys:
+            self._spend(key, max(0, self._level(key, now)), now)
+
+    def _level(self, key, now):
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated_at) * self.rate)
+
+    def _check(self, keys, now):
+        levels = []
+        for key in keys:
+            tokens = self._level(key, now)
+            if tokens < 1:
+                self.rejected += 1
+                raise TooManyAttempts(retry_after=math.ceil((1 - tokens) / self.rate))
+            levels.append((key, tokens))
+        return levels
+
+    def _spend(self, key, tokens, now):
+        self._buckets[key] = (max(0, tokens - 1), now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+    def stats(self):
+        return {"tracked_keys": len(self._buckets), "rejected": self.rejected}
+
+# --- JWT encoding/decoding ---
+
+def create_access_token(data: dict, expires_delta: int = None):
     """
     Creates a JWT access token with the given data payload.
-    The token expires after 'expires_delta' minutes (default: 24 hours).
-    Uses a secret key from environment variable or fallback.
+    The token expires after 'expires_delta' minutes (default: ACCESS_TOKEN_EXPIRE_MINUTES).
     """
-    SECRET_KEY = os.getenv("SECRET_KEY", "your-fallback-secret")
+    if expires_delta is None:
+        expires_delta = settings.access_token_expire_minutes
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=expires_delta)
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm="HS256")
\ No newline at end of file
+    return jwt.encode(to_encode, settings.secret_key, algorithm=settings.jwt_algorithm)
+
+def decode_access_token(token: str) -> dict:
+    """Verify a token's signature and expiry and return its claims (raises JWTError)."""
+    return jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
+
+# --- Authenticated principal ---
+
+class Principal:
+    """The authenticated user, as described by verified token claims."""
+
+    __slots__ = ("id", "username", "email")
+
+    def __init__(self, id, username, email):
+        self.id = id
+        self.username = username
+        self.email = email
@@ -0,0 +1,363 @@
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal
+from app.models import RequirementCacheEntry
+from app.scoring import term_counts
+
+# === In-Process LRU Cache ===
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with optional TTL, entry-count and byte-size limits.
+    `sizeof` estimates the size of a value in bytes (used for `max_bytes`).
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, ttl=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof or (lambda value: len(repr(value)))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._data = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value (refreshing its recency) or `default`."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Insert or replace a value, evicting least recently used entries as needed."""
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # Would evict everything else and still not fit.
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, expires_at)
+            self.bytes += size
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self.bytes > self.max_bytes)
+            ):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Remove a key and return its value."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._remove(key)
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Hit/miss counters and current size, for the /stats/ endpoint."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# === Requirement Extraction Cache ===
+
+
+def normalize_text(text):
+    """Normalize unicode and collapse whitespace so trivially different copies share a key."""
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.split())
+
+
+def content_key(*parts):
+    """sha256 over NUL-separated parts (strings are hashed as given)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def requirement_cache_key(job_text, model, prompt_version):
+    """Content-addressed key for a job description under a given model and prompt."""
+    return content_key(model, prompt_version, normalize_text(job_text))
+
+
+def _json_size(value):
+    return len(json.dumps(value))
+
+
+class RequirementCache:
+    """
+    Two-tier cache for extracted job requirements.
+    Tier 1 is an in-process LRU; tier 2 (optional) is a table in the app database.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=16 * 1024 * 1024, ttl=7 * 24 * 3600, persistent=False):
+        self.memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, sizeof=_json_size)
+        self.ttl = ttl
+        self.persistent = persistent
+        self.db_hits = 0
+        self.db_misses = 0
+
+    async def get(self, key):
+        """Return the cached requirement list for `key`, or None."""
+        requirements = self.memory.get(key)
+        if requirements is not None or not self.persistent:
+            return requirements
+        requirements = await asyncio.to_thread(self._db_get, key)
+        if requirements is None:
+            self.db_misses += 1
+            return None
+        self.db_hits += 1
+        self.memory.set(key, requirements)
+        return requirements
+
+    async def set(self, key, requirements, model, prompt_version):
+        self.memory.set(key, requirements)
+        if self.persistent:
+            await asyncio.to_thread(self._db_set, key, requirements, model, prompt_version)
+
+    def _db_get(self, key):
+        db = SessionLocal()
+        try:
+            entry = db.get(RequirementCacheEntry, key)
+            if entry is None:
+                return None
+            if self.ttl and entry.created_at < datetime.utcnow() - timedelta(seconds=self.ttl):
+                db.delete(entry)
+                db.commit()
+                return None
+            return json.loads(entry.requirements)
+        finally:
+            db.close()
+
+    def _db_set(self, key, requirements, model, prompt_version):
+        db = SessionLocal()
+        try:
+            db.merge(RequirementCacheEntry(
+                key=key,
+                model=model,
+                prompt_version=str(prompt_version),
+                requirements=json.dumps(requirements),
+                created_at=datetime.utcnow(),
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["persistent"] = self.persistent
+        if self.persistent:
+            stats["db_hits"] = self.db_hits
+            stats["db_misses"] = self.db_misses
+        return stats
+
+
+# === Parsed Resume Cache ===
+
+
+class ParsedResume:
+    """Extracted resume text plus the term counts used by the local scorer."""
+
+    __slots__ = ("text", "terms")
+
+    def __init__(self, text, terms):
+        self.text = text
+        self.terms = terms
+
+
+def _parsed_resume_size(parsed):
+    return sys.getsizeof(parsed.text) + sum(
+        sys.getsizeof(term) + sys.getsizeof(count) for term, count in parsed.terms.items()
+    )
+
+
+class ResumeCache:
+    """
+    Cache of parsed resumes keyed by a hash of the uploaded bytes, so a resume
+    resubmitted against another posting is never parsed twice.
+    Tier 1 is an in-process LRU bounded by bytes; tier 2 (optional) is a
+    directory of JSON files.
+    """
+
+    def __init__(self, max_entries=2048, max_bytes=64 * 1024 * 1024, ttl=None, directory=None):
+        self.memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, sizeof=_parsed_resume_size)
+        self.directory = directory
+        self.disk_hits = 0
+        self.disk_misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(digest, fmt, max_pages, max_chars):
+        """Parsing the same bytes under different limits gives different text."""
+        return f"{digest}-{fmt}-{max_pages}-{max_chars}"
+
+    async def get(self, key):
+        """Return the ParsedResume for `key`, or None."""
+        parsed = self.memory.get(key)
+        if parsed is not None or not self.directory:
+            return parsed
+        parsed = await asyncio.to_thread(self._disk_get, key)
+        if parsed is None:
+            self.disk_misses += 1
+            return None
+        self.disk_hits += 1
+        self.memory.set(key, parsed)
+        return parsed
+
+    async def set(self, key, parsed):
+        self.memory.set(key, parsed)
+        if self.directory:
+            await asyncio.to_thread(self._disk_set, key, parsed)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _disk_get(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                stored = json.load(f)
+            return ParsedResume(stored["text"], Counter(stored["terms"]))
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _disk_set(self, key, parsed):
+        # Write then rename, so readers never see a half-written file.
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"text": parsed.text, "terms": parsed.terms}, f)
+        os.replace(temp_path, path)
+
+    def stats(self):
+        stats = self.memory.stats()
+        if self.directory:
+            hits = self.memory.hits + self.disk_hits
+            lookups = self.memory.hits + self.memory.misses
+            stats["disk_hits"] = self.disk_hits
+            stats["disk_misses"] = self.disk_misses
+            stats["hit_ratio"] = hits / lookups if lookups else 0.0
+        return stats
+
+
+# === Analysis Result Cache ===
+
+# Resume blocks longer than this are split into lines for verdict support.
+MAX_SECTION_CHARS = 600
+
+
+def resume_sections(resume_text):
+    """
+    Normalized resume sections: blank-line separated blocks, with long blocks
+    (e.g. a PDF page without blank lines) split into lines. Splitting does not
+    depend on the rest of the text, so editing one section leaves the others
+    unchanged.
+    """
+    sections = []
+    for block in resume_text.split("\n\n"):
+        parts = [block] if len(block) <= MAX_SECTION_CHARS else block.split("\n")
+        sections.extend(text for text in map(normalize_text, parts) if text)
+    return sections
+
+
+class VerdictCache:
+    """
+    Cache of LLM results for resume x job pairs, at two levels:
+
+    - whole analysis responses, keyed by the resume text, the requirement
+      list, the job text, the models and the prompt version;
+    - single requirement verdicts, keyed by the requirement and the resume
+      sections that mention its terms. After a small edit, only requirements
+      whose supporting sections changed need a new verdict.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=32 * 1024 * 1024, ttl=24 * 3600):
+        self.responses = LRUCache(max_entries=max_entries, max_bytes=max_bytes // 2, ttl=ttl, sizeof=_json_size)
+        self.verdicts = LRUCache(max_entries=max_entries * 32, max_bytes=max_bytes // 2, ttl=ttl, sizeof=_json_size)
+
+    @staticmethod
+    def response_key(resume_text, requirements, job_text, model, prompt_version):
+        return content_key(
+            model, prompt_version, normalize_text(resume_text), normalize_text(job_text),
+            json.dumps(requirements, sort_keys=True),
+        )
+
+    @staticmethod
+    def verdict_keys(resume_text, requirements, model, prompt_version):
+        """
+        One key per requirement. A requirement whose terms appear in no
+        section depends on the whole resume.
+        """
+        sections = resume_sections(resume_text)
+        section_terms = [set(term_counts(section)) for section in sections]
+        keys = []
+        for requirement in requirements:
+            title = requirement.get("requirement", "")
+            terms = set(term_counts(title))
+            support = [section for section, found in zip(sections, section_terms) if terms & found]
+            keys.append(content_key(
+                model, prompt_version, title, requirement.get("explanation", ""),
+                *(support or sections),
+            ))
+        return keys
+
+    def get_response(self, key):
+        return self.responses.get(key)
+
+    def set_response(self, key, response):
+        self.responses.set(key, response)
+
+    def get_verdicts(self, keys):
+        """Cached verdict for each key, or None."""
+        return [self.verdicts.get(key) for key in keys]
+
+    def set_verdict(self, key, verdict):
+        self.verdicts.set(key, verdict)
+
+    def stats(self):
+        return {"responses": self.responses.stats(), "verdicts": self.verdicts.stats()}
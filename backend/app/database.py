@@ -2,7 +2,9 @@ import os
 from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 # Get the absolute path to the directory where this file is located.
@@ -12,15 +14,90 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, '..', 'app.db')}"
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
+# --- Connection pool settings (ignored for SQLite) ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))        # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))        # replace connections older than this
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True") == "True"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 5000))
+
+def is_sqlite(url):
+    return url.startswith("sqlite")
+
+def pool_options(url):
+    """Pool sizing/health options for server databases; SQLite keeps SQLAlchemy's defaults."""
+    if is_sqlite(url):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
 # Create the SQLAlchemy engine for connecting to the PostgreSQL database.
-engine = create_engine(SQLALCHEMY_DATABASE_URL)  # <-- Removed connect_args for Postgres
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options(SQLALCHEMY_DATABASE_URL))
 
 # Set up a session factory for database sessions.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# --- Async engine (auth endpoints) ---
+# Same database through an asyncio driver, so request handlers wait on the
+# connection pool instead of occupying threadpool workers.
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+}
+
+def async_database_url(url):
+    """DATABASE_URL with its driver swapped for the asyncio one (ASYNC_DATABASE_URL overrides)."""
+    override = os.getenv("ASYNC_DATABASE_URL")
+    if override:
+        return override
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    return ASYNC_DRIVERS.get(dialect, scheme) + sep + rest
+
+def async_connect_args(url):
+    if url.startswith("postgresql+asyncpg"):
+        return {
+            "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)},
+            "command_timeout": DB_STATEMENT_TIMEOUT_MS / 1000,
+        }
+    if is_sqlite(url):
+        return {"timeout": DB_STATEMENT_TIMEOUT_MS / 1000}  # wait for locks at most this long
+    return {}
+
+ASYNC_DATABASE_URL = async_database_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=async_connect_args(ASYNC_DATABASE_URL),
+    **pool_options(ASYNC_DATABASE_URL),
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Base class for all ORM models.
 Base = declarative_base()
 
+def add_missing_columns(connection, table, names):
+    """
+    Add columns of `table` that an existing database lacks (create_all only
+    creates missing tables). Run with `run_sync` on a connection at startup.
+    """
+    inspector = inspect(connection)
+    if not inspector.has_table(table.name):
+        return
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    for name in names:
+        if name not in existing:
+            column = CreateColumn(table.c[name]).compile(dialect=connection.dialect)
+            connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column}")
+
 def get_db():
     """
     Dependency function to get a database session.
@@ -31,4 +108,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    """
+    Dependency function to get an async database session.
+    Concurrency is bounded by the async engine's pool (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,608 @@
+import re
+from bisect import bisect_right
+from collections import deque
+from datetime import datetime
+
+from app.metrics import metrics
+from app.scoring import term_counts
+
+# === Local Entity Extraction ===
+#
+# Many requirements are structured facts that need no model to check: years of
+# experience, degrees, certifications, languages, locations and security
+# clearance. `extract_entities` finds all of them in one pass over a text: a
+# word-level Aho-Corasick automaton matches the gazetteer below, and one
+# precompiled regex finds year counts and date ranges. It runs on requirement
+# titles (the job side) and on resumes. On a resume a fact only counts in the
+# section where it means something: claimed years in the summary or work
+# history, work dates in the work history, languages on a "Languages" line or
+# section, locations in the name/contact block. "Volunteer tutor for 10 years",
+# "French cooking" or "Travelling to Paris" are not facts about the candidate.
+# Short degree abbreviations ("MS", "B.A.") only count on a line that reads as
+# a degree, so "MS Office" is not a master's; unfinished degrees and
+# clearances the candidate could obtain do not count as held.
+#
+# `local_verdict` then decides a requirement from the resume's entities, but
+# only when the requirement is purely structured (one kind of entity and no
+# other terms left over) and the answer is clear: a requirement is only "not
+# met" when the resume rules it out (e.g. it states a lower clearance), never
+# because a lookup found nothing. Everything else returns None and goes to the
+# model, so the local pass can only remove model work.
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+DEGREE_LEVELS = {1: "diploma", 2: "bachelor's degree", 3: "master's degree", 4: "doctorate"}
+
+DEGREES = {
+    1: ("diploma", "college diploma", "associate degree", "associate s degree", "associates degree"),
+    2: ("bachelor", "bachelors", "b sc", "bsc", "b eng", "beng", "b tech", "btech", "b comm", "bcomm", "bba",
+        "b a sc", "basc", "undergraduate degree"),
+    3: ("masters", "master s", "master of", "master degree", "master in", "m sc", "msc", "m eng", "meng",
+        "m tech", "mtech", "mba", "m a sc", "masc"),
+    4: ("phd", "ph d", "doctorate", "doctoral degree", "doctor of philosophy"),
+}
+# Abbreviations that are also ordinary words or initials ("MS Office", "Plan B, a ..."):
+# only degrees on a line with degree context (see _degree_context).
+DEGREE_ABBREVIATIONS = {
+    2: ("bs", "b s", "ba", "b a", "bfa", "b f a", "b com", "bcom", "b ed", "b s c"),
+    3: ("ms", "m s", "ma", "m a", "mfa", "m f a", "m b a", "m ed", "m s c", "mphil", "m phil"),
+    4: ("d phil", "dphil"),
+}
+_DEGREE_CONTEXT_WORDS = frozenset((
+    "university", "college", "school", "institute", "polytechnic", "degree", "graduated", "graduate",
+    "major", "minor", "gpa", "thesis", "honours", "honors", "cum", "laude",
+))
+# "Ph.D. candidate", "M.S. (expected 2027)": not held yet.
+_UNFINISHED_WORDS = frozenset(("candidate", "pursuing", "expected", "ongoing", "progress", "incomplete"))
+
+# canonical name -> aliases
+CERTIFICATIONS = {
+    "PMP": ("pmp", "project management professional"),
+    "CISSP": ("cissp",),
+    "CISM": ("cism",),
+    "CISA": ("cisa",),
+    "CCNA": ("ccna",),
+    "CCNP": ("ccnp",),
+    "CPA": ("cpa", "chartered professional accountant"),
+    "CFA": ("cfa", "chartered financial analyst"),
+    "ITIL": ("itil",),
+    "PRINCE2": ("prince2",),
+    "Six Sigma": ("six sigma", "lean six sigma"),
+    "Certified ScrumMaster": ("certified scrum master", "certified scrummaster", "csm", "scrum master certification"),
+    "CompTIA Security+": ("comptia security",),
+    "RHCE": ("rhce", "red hat certified engineer"),
+    "Certified Kubernetes Administrator": ("certified kubernetes administrator", "cka"),
+    "AWS Certified Solutions Architect": ("aws certified solutions architect", "aws solutions architect"),
+    "AWS Certified Developer": ("aws certified developer",),
+    "Google Professional Data Engineer": ("google professional data engineer", "gcp professional data engineer"),
+    "Google Professional Cloud Architect": ("google professional cloud architect",),
+    "Azure Developer Associate": ("azure developer associate",),
+    "Azure Administrator Associate": ("azure administrator associate",),
+    "Azure Solutions Architect Expert": ("azure solutions architect expert",),
+}
+
+LANGUAGES = (
+    "english", "french", "spanish", "german", "italian", "portuguese", "dutch", "polish", "russian",
+    "ukrainian", "arabic", "hebrew", "hindi", "punjabi", "urdu", "bengali", "tamil", "mandarin", "cantonese",
+    "chinese", "japanese", "korean", "vietnamese", "tagalog", "filipino", "thai", "indonesian", "turkish",
+    "persian", "farsi", "greek",
+)
+
+# Unambiguous city names only (no "London", "Victoria", ...).
+LOCATIONS = (
+    "toronto", "montreal", "vancouver", "ottawa", "calgary", "edmonton", "winnipeg", "halifax", "quebec city",
+    "mississauga", "waterloo", "kitchener", "saskatoon", "regina", "gatineau", "hamilton ontario",
+    "new york", "san francisco", "seattle", "boston", "chicago", "austin", "los angeles", "denver", "atlanta",
+    "hanoi", "ho chi minh city", "singapore", "berlin", "amsterdam", "dublin", "paris",
+)
+
+# Clearance levels, lowest first. 0 is "some security clearance".
+CLEARANCES = {
+    0: ("security clearance", "government clearance"),
+    1: ("reliability status", "reliability clearance", "reliability security clearance"),
+    2: ("enhanced reliability",),
+    3: ("secret clearance", "secret security clearance", "secret level", "level ii clearance"),
+    4: ("top secret", "level iii clearance"),
+    5: ("ts sci", "top secret sci"),
+}
+# Values of a "Clearance: <level>" label ("Security Clearance: Secret").
+CLEARANCE_VALUES = {
+    "reliability": 1, "reliability status": 1, "enhanced reliability": 2, "enhanced reliability status": 2,
+    "secret": 3, "level ii": 3, "top secret": 4, "level iii": 4, "ts sci": 5, "top secret sci": 5,
+}
+_CLEARANCE_LABEL_RE = re.compile(r"\bclearance(?: level)?\s*[:|–-]\s*(?P<value>[a-z /]+)")
+# "Eligible for Secret clearance", "clearance pending": not held.
+_UNHELD_WORDS = frozenset((
+    "eligible", "eligibility", "obtain", "obtaining", "willing", "able", "pending", "applied", "expired", "lapsed",
+))
+
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20,
+}
+
+# Year counts ("5+ years", "3-5 yrs", "five years") and date ranges ("2019 - present").
+_FACTS_RE = re.compile(
+    r"\b(?P<years>\d{1,2}|" + "|".join(_NUMBER_WORDS) + r")\s*\+?\s*"
+    r"(?:(?:-|–|to)\s*\d{1,2}\s*\+?\s*)?(?:years?|yrs?)\b"
+    r"|\b(?P<start>(?:19|20)\d{2})\s*(?:-|–|—|to)\s*(?P<end>(?:19|20)\d{2}|present|current|now|today)\b"
+)
+_SENTENCE_END_RE = re.compile(r"[.;\n]")
+_EDUCATION_WORDS = frozenset(("university", "college", "school", "institute", "polytechnic"))
+_EXPERIENCE_WORDS = frozenset(("experience", "experienced"))
+_UNPAID_WORDS = frozenset(("volunteer", "volunteering", "volunteered", "hobby", "hobbies"))
+
+# Resume section headings.
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "career summary", "profile", "professional profile",
+                "about me", "objective", "career objective", "highlights", "summary of qualifications"),
+    "experience": ("experience", "work experience", "professional experience", "relevant experience",
+                   "employment", "employment history", "work history", "career history"),
+    "languages": ("languages", "language", "language skills", "spoken languages"),
+    "education": ("education", "academic background", "education and training", "academic history",
+                  "academic qualifications"),
+    "contact": ("contact", "contact information", "contact info", "contact details", "personal details",
+                "personal information"),
+}
+_HEADINGS = {
+    " ".join(_TOKEN_RE.findall(heading)): section
+    for section, headings in SECTION_HEADINGS.items() for heading in headings
+}
+# Words of every other heading ("Education", "Volunteer Experience", ...); these end the sections above.
+_HEADING_WORDS = frozenset("""
+education academic background training courses coursework skills technical technologies tools competencies
+expertise projects volunteer volunteering community involvement activities extracurricular interests hobbies
+certifications certificates licenses licences awards honors honours achievements accomplishments publications
+presentations research references leadership memberships affiliations additional information other
+experience and of
+""".split())
+# A labelled line, e.g. "Languages: English, French" or "Location: Toronto".
+_LABEL_RE = re.compile(
+    r"[^a-z0-9]*(?:(?P<languages>(?:spoken )?languages?(?: skills)?)|(?P<contact>location|address|based in))\s*[:|–-]"
+)
+_HEADER_LINES = 6  # non-empty lines at the top that can hold the name and contact details
+# Contact lines are fields ("Toronto, ON | jane@example.com"), not sentences.
+_FIELD_SEPARATOR_RE = re.compile(r"[|•·,;:\t]")
+
+
+class Gazetteer:
+    """Word-level Aho-Corasick automaton: finds every phrase in a token list in one pass."""
+
+    def __init__(self, entries):
+        """`entries` are (phrase, value) pairs; phrases are tokenized like the searched text."""
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for phrase, value in entries:
+            tokens = _TOKEN_RE.findall(phrase.lower())
+            node = 0
+            for token in tokens:
+                child = self._goto[node].get(token)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][token] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = child
+            self._out[node] += ((len(tokens), value),)
+
+        # Breadth-first, so every failure target is finished before it is used.
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(token, 0)
+                self._out[child] += self._out[self._fail[child]]
+                queue.append(child)
+
+    def search(self, tokens):
+        """Leftmost-longest, non-overlapping matches as (first token, end token, value)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        found = []
+        node = 0
+        for index, token in enumerate(tokens):
+            if not node and token not in root:
+                continue  # most words start no phrase
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            for length, value in out[node]:
+                found.append((index + 1 - length, index + 1, value))
+        found.sort(key=lambda match: (match[0], match[0] - match[1]))
+        matches = []
+        end = 0
+        for match in found:
+            if match[0] >= end:
+                matches.append(match)
+                end = match[1]
+        return matches
+
+
+def _gazetteer_entries():
+    for level, phrases in DEGREES.items():
+        for phrase in phrases:
+            yield phrase, ("degree", level)
+    for level, phrases in DEGREE_ABBREVIATIONS.items():
+        for phrase in phrases:
+            yield phrase, ("degree abbreviation", level)
+    for name, aliases in CERTIFICATIONS.items():
+        for alias in aliases:
+            yield alias, ("certification", name)
+    for language in LANGUAGES:
+        yield language, ("language", language.capitalize())
+    for location in LOCATIONS:
+        yield location, ("location", location.title())
+    for level, phrases in CLEARANCES.items():
+        for phrase in phrases:
+            yield phrase, ("clearance", level)
+
+
+GAZETTEER = Gazetteer(_gazetteer_entries())
+
+
+class Entities:
+    """Structured facts found in one text."""
+
+    __slots__ = (
+        "degrees", "certifications", "languages", "locations", "clearance", "clearance_unspecified",
+        "experience", "career_years", "entity_tokens",
+    )
+
+    def __init__(self):
+        self.degrees = []          # (level, text of the line it appears on)
+        self.certifications = set()
+        self.languages = set()
+        self.locations = set()
+        self.clearance = None      # highest level found
+        self.clearance_unspecified = False  # a clearance line that names no level ("security clearance")
+        self.experience = []       # (years, terms of the sentence stating them)
+        self.career_years = 0      # total years covered by (non-education) date ranges
+        self.entity_tokens = set() # tokens that were part of an entity
+
+    def kinds(self):
+        kinds = []
+        if self.experience:
+            kinds.append("experience")
+        for kind in ("degrees", "certifications", "languages", "locations"):
+            if getattr(self, kind):
+                kinds.append(kind)
+        if self.clearance is not None:
+            kinds.append("clearance")
+        return kinds
+
+
+def _heading(tokens):
+    """The section a heading line starts ("other" if not one we use), or None for other lines."""
+    if not tokens or len(tokens) > 4:
+        return None
+    section = _HEADINGS.get(" ".join(tokens))
+    if section is None and all(token in _HEADING_WORDS for token in tokens):
+        section = "other"
+    return section
+
+
+def _line_sections(lines, line_tokens):
+    """
+    Section of each (lower-cased) resume line: "header" for the first few
+    lines before any heading or sentence, None for unlabelled text after them.
+    """
+    sections = []
+    section = "header"
+    seen = 0
+    for line, tokens in zip(lines, line_tokens):
+        heading = _heading(tokens)
+        if heading is not None:
+            section = heading
+        elif tokens:
+            seen += 1
+            if section == "header" and (seen > _HEADER_LINES or len(tokens) > 12 or line.rstrip().endswith(".")):
+                section = None
+        label = _LABEL_RE.match(line)
+        sections.append(label.lastgroup if label else section)
+    return sections
+
+
+def _sentence_at(text, start, end):
+    """The sentence (or list item) of `text` containing [start, end), at most 300 characters back."""
+    begin = max(0, start - 300)
+    for boundary in _SENTENCE_END_RE.finditer(text, begin, start):
+        begin = boundary.end()
+    after = _SENTENCE_END_RE.search(text, end)
+    return text[begin:after.start() if after else len(text)]
+
+
+def _is_field(line, tokens):
+    """True if `tokens` make up one whole separator-delimited field of `line`."""
+    return any(_TOKEN_RE.findall(field) == tokens for field in _FIELD_SEPARATOR_RE.split(line))
+
+
+def _degree_context(line, line_tokens, section, words, first, end):
+    """
+    True if the abbreviation words[first:end] on `line` reads as a degree:
+    in the education section, on a line naming a school or degree, written
+    with dots ("M.S."), or followed by "in"/"of" ("BS in Physics").
+    """
+    if section == "education" or _DEGREE_CONTEXT_WORDS.intersection(line_tokens):
+        return True
+    if end < len(words) and words[end] in ("in", "of"):
+        return True
+    letters = words[first:end]
+    return len(letters) > 1 and re.search(r"\.\s*".join(map(re.escape, letters)) + r"\.", line) is not None
+
+
+def _clearance_label(line):
+    """(level, value words) of a "Clearance: <level>" label on `line`, or None."""
+    label = _CLEARANCE_LABEL_RE.search(line)
+    if label is None:
+        return None
+    value = _TOKEN_RE.findall(label.group("value"))
+    for length in range(min(len(value), 3), 0, -1):
+        level = CLEARANCE_VALUES.get(" ".join(value[:length]))
+        if level is not None:
+            return level, value[:length]
+    return None
+
+
+def extract_entities(text, resume=False):
+    """
+    All gazetteer entities, year counts and date ranges in `text`, in one pass
+    each. With `resume`, languages, locations and experience only count in
+    the resume sections that state them about the candidate.
+    """
+    entities = Entities()
+    lower = text.lower()
+    lines = text.split("\n")
+    lower_lines = lower.split("\n")
+    line_tokens = [_TOKEN_RE.findall(line) for line in lower_lines]
+    # Tokens of the whole text, the token count at the end of each line and where each line starts.
+    words = []
+    line_ends = []
+    line_starts = []
+    offset = 0
+    for line, tokens in zip(lower_lines, line_tokens):
+        words += tokens
+        line_ends.append(len(words))
+        line_starts.append(offset)
+        offset += len(line) + 1
+    sections = _line_sections(lower_lines, line_tokens) if resume else None
+    clearance_lines = {}  # line number -> clearance levels named on it
+    abbreviations = []    # (line number, first token, end token, level)
+
+    for first, end, (kind, value) in GAZETTEER.search(words):
+        number = bisect_right(line_ends, first)
+        section = sections[number] if resume else None
+        if kind == "degree abbreviation":
+            abbreviations.append((number, first, end, value))
+            continue
+        entities.entity_tokens.update(words[first:end])
+        if kind == "degree":
+            if not (resume and _UNFINISHED_WORDS.intersection(line_tokens[number])):
+                entities.degrees.append((value, lines[number].strip()))
+        elif kind == "certification":
+            entities.certifications.add(value)
+        elif kind == "language":
+            if not resume or section == "languages":
+                entities.languages.add(value)
+        elif kind == "location":
+            # "Toronto, ON" in the contact details; not "University of Toronto" or "travelling to Paris".
+            if not resume or (
+                section in ("header", "contact")
+                and _is_field(lower_lines[number], words[first:end])
+                and not _EDUCATION_WORDS.intersection(line_tokens[number])
+            ):
+                entities.locations.add(value)
+        elif kind == "clearance":
+            clearance_lines.setdefault(number, []).append(value)
+
+    # One abbreviation in context makes the line a degree line: "BS/MS in Physics" names both.
+    degree_lines = {
+        number for number, first, end, _ in abbreviations
+        if _degree_context(lower_lines[number], line_tokens[number], sections[number] if resume else None,
+                           words, first, end)
+    }
+    for number, first, end, level in abbreviations:
+        if number in degree_lines:
+            entities.entity_tokens.update(words[first:end])
+            if not (resume and _UNFINISHED_WORDS.intersection(line_tokens[number])):
+                entities.degrees.append((level, lines[number].strip()))
+
+    for number, line in enumerate(lower_lines):
+        if "clearance" not in line_tokens[number]:
+            continue
+        label = _clearance_label(line)
+        if label is not None:
+            level, value = label
+            entities.entity_tokens.update(value)
+            clearance_lines.setdefault(number, []).append(level)
+    for number, levels in clearance_lines.items():
+        if resume and _UNHELD_WORDS.intersection(line_tokens[number]):
+            continue
+        level = max(levels)  # "Security Clearance: Secret" is Secret, not just "some clearance"
+        if level == 0:
+            entities.clearance_unspecified = True
+        entities.clearance = max(level, entities.clearance if entities.clearance is not None else level)
+
+    periods = []
+    this_year = datetime.utcnow().year
+    for match in _FACTS_RE.finditer(lower):
+        entities.entity_tokens.update(_TOKEN_RE.findall(match.group()))
+        number = bisect_right(line_starts, match.start()) - 1
+        section = sections[number] if resume else None
+        if match.group("years"):
+            years = match.group("years")
+            years = _NUMBER_WORDS[years] if years in _NUMBER_WORDS else int(years)
+            terms = set(term_counts(_sentence_at(lower, match.start(), match.end())))
+            # Only "N years of experience" in the summary or work history, not "tutor for 10 years".
+            if resume and (
+                section not in ("header", "summary", "experience", None)
+                or not terms & _EXPERIENCE_WORDS
+                or terms & _UNPAID_WORDS
+            ):
+                continue
+            entities.experience.append((years, terms))
+        else:
+            if resume and section != "experience":
+                continue
+            if _EDUCATION_WORDS.intersection(line_tokens[number]):
+                continue
+            start = int(match.group("start"))
+            end = match.group("end")
+            end = int(end) if end.isdigit() else this_year
+            if start <= end <= this_year:
+                periods.append((start, end))
+    entities.career_years = _covered_years(periods)
+    return entities
+
+
+def _covered_years(periods):
+    """Total length of the union of (start, end) year ranges."""
+    total = 0
+    reach = None
+    for start, end in sorted(periods):
+        if reach is None or start > reach:
+            total += end - start
+            reach = end
+        elif end > reach:
+            total += end - reach
+            reach = end
+    return total
+
+# === Local Verdicts ===
+
+# Words that say how much a requirement matters, not what it is.
+_FILLER = frozenset("""
+required requirement requirements preferred asset assets plus nice must strong minimum least min
+professional experience experienced hands solid proven demonstrated relevant working knowledge level
+valid current active degree certification certifications certified certificate certificates
+years year yrs equivalent related field fields discipline similar area holder holding hold
+fluent fluency bilingual proficient proficiency proficiently speak speaking spoken written oral
+language languages native communication communicate skills ability able obtain obtained
+eligible eligibility willing clearance security status located location based onsite site office
+""".split())
+_QUALIFIERS = frozenset((
+    "equivalent", "equivalency", "obtain", "obtained", "eligible", "eligibility", "able", "ability", "willing",
+))
+
+
+def _residual(title, requirement):
+    """Terms of a requirement title that no entity or filler word accounts for."""
+    return {
+        term for term in term_counts(title)
+        if term not in requirement.entity_tokens and term not in _FILLER and not term.isdigit()
+    }
+
+
+def local_verdict(requirement, resume):
+    """
+    A verdict dict for `requirement` decided from the `resume` Entities, or
+    None when the requirement is not purely structured or the resume is not
+    clear enough either way.
+    """
+    title = requirement.get("requirement") or ""
+    entities = extract_entities(title)
+    kinds = entities.kinds()
+    if len(kinds) != 1:
+        return None
+    kind = kinds[0]
+    words = set(_TOKEN_RE.findall(title.lower()))
+    residual = _residual(title, entities)
+    decided = _DECIDERS[kind](entities, resume, residual, words)
+    if decided is None:
+        return None
+    met, explanation = decided
+    # "Eligible to obtain ...", "or equivalent experience": a missing entity does not settle these,
+    # whether the title or the requirement's explanation says so.
+    context = set(_TOKEN_RE.findall((requirement.get("explanation") or "").lower()))
+    if not met and ((words | context) & _QUALIFIERS or "or" in context):
+        return None
+    metrics.inc("local_verdicts_total", kind=kind, met=str(met).lower())
+    return {"requirement": title, "met": met, "explanation": explanation}
+
+
+def _decide_experience(required, resume, residual, words):
+    years = min(years for years, _ in required.experience)
+    if not residual:
+        claimed = max((claim for claim, _ in resume.experience), default=0)
+        if claimed >= years:
+            return True, f"The resume states {claimed} years of experience."
+        if resume.career_years >= years:
+            return True, f"The work history covers about {resume.career_years} years."
+        return None
+    for claim, terms in resume.experience:
+        if claim >= years and residual <= terms:
+            return True, f"The resume states {claim} years of experience with {', '.join(sorted(residual))}."
+    return None
+
+
+def _decide_degrees(required, resume, residual, words):
+    # Only ever "met": a degree the gazetteer does not know (e.g. "LL.M.") is no evidence of its absence.
+    level = min(level for level, _ in required.degrees)
+    for held, line in sorted(resume.degrees, reverse=True):
+        if held >= level and (not residual or residual <= set(term_counts(line))):
+            return True, f"Holds a {DEGREE_LEVELS[held]} ({line[:80]})."
+    return None
+
+
+def _decide_certifications(required, resume, residual, words):
+    if residual:
+        return None
+    held = required.certifications & resume.certifications
+    needed = required.certifications
+    if held and ("or" in words or held == needed):
+        return True, f"Lists the {', '.join(sorted(held))} certification."
+    missing = needed - resume.certifications
+    return False, f"No {', '.join(sorted(missing))} certification on the resume."
+
+
+def _decide_languages(required, resume, residual, words):
+    if residual:
+        return None
+    spoken = required.languages & resume.languages
+    missing = required.languages - resume.languages
+    if not missing or (spoken and "or" in words):
+        return True, f"The resume lists {', '.join(sorted(spoken))}."
+    if missing <= {"English"} or not resume.languages:
+        return None  # English is usually implied; no languages listed says nothing
+    return False, f"{', '.join(sorted(missing))} is not listed on the resume."
+
+
+def _decide_locations(required, resume, residual, words):
+    places = required.locations & resume.locations
+    if residual or not places:
+        return None
+    return True, f"The resume places the candidate in {', '.join(sorted(places))}."
+
+
+def _decide_clearance(required, resume, residual, words):
+    if residual:
+        return None
+    if resume.clearance is not None and resume.clearance >= required.clearance:
+        return True, "The resume lists a sufficient security clearance."
+    # Not met only when the resume names its (lower) level; no or an unnamed clearance is for the model.
+    if resume.clearance and not resume.clearance_unspecified:
+        return False, "The resume lists a lower security clearance."
+    return None
+
+
+_DECIDERS = {
+    "experience": _decide_experience,
+    "degrees": _decide_degrees,
+    "certifications": _decide_certifications,
+    "languages": _decide_languages,
+    "locations": _decide_locations,
+    "clearance": _decide_clearance,
+}
+
+
+def local_verdicts(resume_text, requirements):
+    """Verdict (or None) for each requirement, extracting the resume's entities once."""
+    resume = extract_entities(resume_text, resume=True)
+    return [local_verdict(requirement, resume) for requirement in requirements]
+
+
+metrics.describe("local_verdicts_total", "Requirements decided by the local entity matcher, without the model.")
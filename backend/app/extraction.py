@@ -0,0 +1,287 @@
+import asyncio
+import codecs
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# === Parsers ===
+# These run inside the extraction worker processes, so this module must stay
+# cheap to import (no FastAPI/OpenAI/database imports). PyPDF2 and python-docx
+# are imported by the parsers themselves, so the web process only loads them
+# when it parses in-process; workers load them in _warm_up_worker.
+#
+# Parsers are generators that yield text a page/paragraph at a time, so the
+# caller can stop as soon as it has enough characters for the LLM prompt.
+
+
+def iter_pdf_pages(file, max_pages=None):
+    """Yield the text of each PDF page, up to `max_pages` pages."""
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(file)
+    for number, page in enumerate(pdf_reader.pages):
+        if max_pages is not None and number >= max_pages:
+            break
+        yield page.extract_text() or ''
+
+
+def iter_docx_paragraphs(file):
+    """Yield the text of each paragraph in a Word (.docx) file."""
+    from docx import Document
+
+    document = Document(file)
+    for para in document.paragraphs:
+        yield para.text
+
+
+def iter_plain_text(file, chunk_size=64 * 1024):
+    """Yield decoded chunks of a plain text file."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def collect_text(chunks, separator='', max_chars=None):
+    """
+    Join text chunks in linear time, stopping once `max_chars` characters
+    have been collected (remaining pages are never parsed).
+    """
+    parts = []
+    total = 0
+    for chunk in chunks:
+        if parts:
+            chunk = separator + chunk
+        if max_chars is not None and total + len(chunk) >= max_chars:
+            parts.append(chunk[:max_chars - total])
+            break
+        parts.append(chunk)
+        total += len(chunk)
+    if isinstance(chunks, types.GeneratorType):
+        chunks.close()
+    return ''.join(parts)
+
+
+def extract_text_from_pdf(file, max_pages=None, max_chars=None):
+    """
+    Extract text from a PDF file (each page), within the page and character
+    budgets. Pages are separated by form feeds, so page headers and footers
+    can be told apart later (see app.prompts.clean_text).
+    """
+    return collect_text(iter_pdf_pages(file, max_pages=max_pages), separator='\f', max_chars=max_chars)
+
+
+def extract_text_from_docx(file, max_chars=None):
+    """Extract text from a Word (.docx) file, within the character budget."""
+    return collect_text(iter_docx_paragraphs(file), separator='\n', max_chars=max_chars)
+
+
+def file_format(filename):
+    """Short format name used to pick a parser and to group timing stats."""
+    filename = (filename or "").lower()
+    if filename.endswith('.pdf'):
+        return "pdf"
+    if filename.endswith('.docx'):
+        return "docx"
+    return "text"
+
+
+def extract_text_from_stream(filename, stream, max_pages=None, max_chars=None):
+    """
+    Extract text from a binary file-like object, choosing the parser by filename.
+    Supports: PDF (.pdf), Word (.docx), and plain text (.txt).
+    """
+    fmt = file_format(filename)
+    if fmt == "pdf":
+        return extract_text_from_pdf(stream, max_pages=max_pages, max_chars=max_chars)
+    elif fmt == "docx":
+        return extract_text_from_docx(stream, max_chars=max_chars)
+    else:
+        # Treat everything else as plain text
+        return collect_text(iter_plain_text(stream), max_chars=max_chars)
+
+
+def _extract_in_worker(filename, source, max_pages, max_chars):
+    """
+    Process-pool entry point (must be a module-level function to be picklable).
+    `source` is either the file's bytes or the path of a spooled temp copy.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as stream:
+            return extract_text_from_stream(filename, stream, max_pages=max_pages, max_chars=max_chars)
+    return extract_text_from_stream(filename, io.BytesIO(source), max_pages=max_pages, max_chars=max_chars)
+
+# === Upload Spooling ===
+# Small uploads are passed to workers as bytes. Large ones are copied to a temp
+# file on disk in chunks and only the path crosses the process boundary, so a
+# 100-page portfolio PDF is never held in memory (or pickled) as a whole.
+
+
+async def spool_upload(upload, max_memory=1024 * 1024):
+    """
+    Read an UploadFile for extraction. Returns (source, sha256 hex digest), where
+    source is the file's bytes if small, else the path of a temp copy.
+    """
+    size = upload.size
+    if size is not None and size <= max_memory:
+        data = await upload.read()
+        return data, hashlib.sha256(data).hexdigest()
+    suffix = os.path.splitext(upload.filename or "")[1]
+    return await asyncio.to_thread(_copy_to_temp_file, upload.file, suffix)
+
+
+def _copy_to_temp_file(file, suffix, chunk_size=1024 * 1024):
+    """Copy a file to a named temp file in chunks, hashing it on the way."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, prefix="upload-") as temp:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            temp.write(chunk)
+    return temp.name, digest.hexdigest()
+
+
+def discard_spooled(source):
+    """Remove the temp file behind a spooled upload, if there is one."""
+    if isinstance(source, str):
+        try:
+            os.unlink(source)
+        except FileNotFoundError:
+            pass
+
+
+def _warm_up_worker():
+    """Load the parsers in a worker process ahead of its first document."""
+    import PyPDF2
+    import docx
+    return os.getpid()
+
+# === Extraction Service ===
+
+
+class ExtractionError(Exception):
+    """Raised when a document could not be parsed (bad file, timeout, crashed worker)."""
+
+
+class ExtractionService:
+    """
+    Runs PDF/DOCX parsing in a process pool so CPU-bound parsing never blocks
+    the event loop and can use every core. In-memory plain text is decoded inline.
+
+    workers=0 parses in a background thread instead (handy for local dev).
+
+    The timeout counts from when a worker picks a file up, not from when it
+    is submitted: a large batch queues behind `workers` slots first. A file
+    that times out keeps its worker process busy (and its slot taken) until
+    the parser returns, since a running process job cannot be cancelled.
+    """
+
+    def __init__(self, workers=None, timeout=30.0, max_pages=50, max_chars=None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self._pool = None
+        self._slots = None  # asyncio.Semaphore(workers), created on the serving event loop
+        self._stats = {}
+
+    def _get_pool(self):
+        if self._pool is None:
+            # "spawn" keeps workers independent of the server's threads and event loop.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def warm_up(self):
+        """Start the worker processes ahead of the first upload."""
+        if self.workers == 0:
+            return
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        await asyncio.gather(*[
+            loop.run_in_executor(pool, _warm_up_worker) for _ in range(self.workers)
+        ])
+
+    async def extract(self, filename, source):
+        """
+        Extract text from an uploaded file, given its bytes or a spooled temp path
+        (see spool_upload). Text is capped at `max_chars` characters.
+        """
+        fmt = file_format(filename)
+        started = time.perf_counter()
+        args = (filename, source, self.max_pages, self.max_chars)
+        try:
+            if fmt == "text" and isinstance(source, bytes):
+                text = _extract_in_worker(*args)
+            elif fmt == "text" or self.workers == 0:
+                text = await asyncio.wait_for(asyncio.to_thread(_extract_in_worker, *args), self.timeout)
+            else:
+                text = await self._extract_in_pool(*args)
+        except asyncio.TimeoutError:
+            self._record(fmt, time.perf_counter() - started, outcome="timeouts")
+            raise ExtractionError(f"Timed out extracting text from {filename}")
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool for the next request.
+            self._pool = None
+            self._record(fmt, time.perf_counter() - started, outcome="errors")
+            raise ExtractionError(f"Extraction worker crashed on {filename}")
+        except Exception as e:
+            self._record(fmt, time.perf_counter() - started, outcome="errors")
+            raise ExtractionError(f"Could not extract text from {filename}: {e}")
+        self._record(fmt, time.perf_counter() - started)
+        return text
+
+    async def _extract_in_pool(self, *args):
+        """Wait for a free worker, then run one extraction under the timeout."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        await self._slots.acquire()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._get_pool(), _extract_in_worker, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release_slot)
+        # Shielded: on timeout the job keeps running, and its slot is freed when it ends.
+        return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+
+    def _release_slot(self, future):
+        self._slots.release()
+        if not future.cancelled():
+            future.exception()  # retrieved, even if the caller timed out
+
+    def _record(self, fmt, seconds, outcome=None):
+        stats = self._stats.setdefault(fmt, {
+            "count": 0, "errors": 0, "timeouts": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+        })
+        stats["count"] += 1
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        if outcome:
+            stats[outcome] += 1
+
+    def stats(self):
+        """Extraction counts and timings per file format."""
+        return {
+            fmt: dict(stats, avg_seconds=stats["total_seconds"] / stats["count"])
+            for fmt, stats in self._stats.items()
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -1,5 +1,5 @@
 from app.database import Base, engine
-from app.models import User
+from app.models import User, JobPosting, RequirementCacheEntry, AnalysisJob
 
 print("Creating all tables...")
 # Use SQLAlchemy's metadata to create all tables defined in the ORM models.
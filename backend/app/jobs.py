@@ -0,0 +1,256 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select, update
+
+from app.database import AsyncSessionLocal, add_missing_columns, async_engine
+from app.llm import LLMRateLimitError
+from app.metrics import metrics, span
+from app.models import AnalysisJob
+
+# === Background Analysis Queue ===
+#
+# Analyses submitted through POST /analyses/ are stored as AnalysisJob rows
+# and run by a fixed number of asyncio workers, which bounds how many analyses
+# (and so model calls) are in flight at once. The database row is the source of
+# truth: workers claim a job with a conditional UPDATE that records this
+# process as its owner plus a lease, which the process renews while it runs
+# the job. Only jobs whose lease has lapsed (their process died) are taken
+# back, on startup or by any live process, so two processes never run the
+# same job; results are only stored by the job's current owner. The
+# analysis_jobs table (and its newer columns) is created on startup if the
+# database predates it.
+#
+# A job that hits the model's rate limit goes back to "queued" and is retried
+# after an exponential backoff, without holding a worker while it waits.
+# Submitting the same inputs as a job still in flight returns that job.
+
+class QueueFull(Exception):
+    """Too many jobs waiting; the caller should retry later."""
+
+
+class AnalysisQueue:
+    def __init__(self, handler, workers=4, max_pending=1000, max_attempts=5, retry_delay=2.0, max_retry_delay=60.0,
+                 lease_seconds=60.0):
+        self.handler = handler          # async handler(payload) -> JSON-serialisable result
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.lease_seconds = lease_seconds  # renewed every lease_seconds / 3 while a job runs
+        self.owner = "%s:%d:%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self.retries = 0
+        self.deduplicated = 0
+        self.reclaimed = 0
+        self._queue = None             # created in start(), on the serving event loop
+        self._inflight = {}             # dedupe key -> job ID, for queued/running jobs
+        self._storing = {}              # dedupe key -> asyncio.Event, while its job is being inserted
+        self._tasks = []
+        self._timers = []
+
+    # --- Lifecycle ---
+
+    async def start(self):
+        """Re-queue unfinished jobs from a previous run and start the workers."""
+        self._queue = asyncio.Queue()
+        async with async_engine.begin() as connection:
+            await connection.run_sync(AnalysisJob.__table__.create, checkfirst=True)
+            await connection.run_sync(add_missing_columns, AnalysisJob.__table__, ("owner", "lease_expires_at"))
+        await self._reclaim_expired()
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(AnalysisJob.id, AnalysisJob.dedupe_key)
+                .where(AnalysisJob.status == "queued")
+                .order_by(AnalysisJob.created_at)
+            )
+            for job_id, dedupe_key in rows:
+                self._inflight[dedupe_key] = job_id
+                self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._keep_leases()))
+
+    async def stop(self):
+        """Stop the workers; interrupted jobs are resumed by the next start()."""
+        for timer in self._timers:
+            timer.cancel()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # --- Submitting and polling ---
+
+    async def submit(self, dedupe_key, payload):
+        """Queue a job; returns (job ID, True if an identical in-flight job was reused)."""
+        # An identical submission (e.g. a double click) is still being stored: wait for its row.
+        while dedupe_key in self._storing:
+            await self._storing[dedupe_key].wait()
+        job_id = self._inflight.get(dedupe_key)
+        if job_id is not None:
+            self.deduplicated += 1
+            return job_id, True
+        if len(self._inflight) + len(self._storing) >= self.max_pending:
+            raise QueueFull("Too many analyses waiting")
+        job_id = uuid.uuid4().hex
+        # The key is reserved before the first await, and released whether or not the insert succeeds.
+        stored = self._storing[dedupe_key] = asyncio.Event()
+        try:
+            async with AsyncSessionLocal() as db:
+                db.add(AnalysisJob(id=job_id, dedupe_key=dedupe_key, status="queued", payload=json.dumps(payload)))
+                await db.commit()
+            self._inflight[dedupe_key] = job_id
+        finally:
+            del self._storing[dedupe_key]
+            stored.set()
+        self._queue.put_nowait(job_id)
+        metrics.inc("analysis_jobs_total", status="queued")
+        return job_id, False
+
+    async def get(self, job_id):
+        async with AsyncSessionLocal() as db:
+            return await db.get(AnalysisJob, job_id)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "pending": len(self._inflight),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "retries": self.retries,
+            "deduplicated": self.deduplicated,
+            "reclaimed": self.reclaimed,
+        }
+
+    # --- Workers ---
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # e.g. the database is unreachable: keep the worker alive
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id):
+        async with AsyncSessionLocal() as db:
+            now = datetime.utcnow()
+            claimed = await db.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.id == job_id, AnalysisJob.status == "queued")
+                .values(
+                    status="running", started_at=now, attempts=AnalysisJob.attempts + 1,
+                    owner=self.owner, lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                )
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                return  # finished, or claimed by another process
+            job = await db.get(AnalysisJob, job_id)
+
+            try:
+                with span("analysis_job"):
+                    result = await self.handler(json.loads(job.payload))
+            except LLMRateLimitError as e:
+                if job.attempts < self.max_attempts:
+                    if await self._release(db, job, status="queued", error=str(e), owner=None):
+                        self._retry_later(job_id, job.attempts, e.retry_after)
+                    return
+                await self._finish(db, job, "failed", error=str(e))
+                return
+            except Exception as e:
+                await self._finish(db, job, "failed", error=str(e) or type(e).__name__)
+                return
+            await self._finish(db, job, "done", result=json.dumps(result))
+
+    async def _finish(self, db, job, status, result=None, error=None):
+        if await self._release(db, job, status=status, result=result, error=error, finished_at=datetime.utcnow()):
+            self._inflight.pop(job.dedupe_key, None)
+            metrics.inc("analysis_jobs_total", status=status)
+
+    async def _release(self, db, job, **values):
+        """
+        Store the outcome of a job this process claimed; False (storing
+        nothing) if its lease lapsed and the job was taken back meanwhile.
+        """
+        released = await db.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job.id, AnalysisJob.status == "running", AnalysisJob.owner == self.owner)
+            .values(lease_expires_at=None, **values)
+        )
+        await db.commit()
+        if released.rowcount != 1:
+            self._inflight.pop(job.dedupe_key, None)  # whoever re-queued it tracks it now
+            return False
+        return True
+
+    # --- Leases ---
+
+    async def _keep_leases(self):
+        """Renew the leases of jobs running here and take back lapsed ones, every lease_seconds / 3."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(AnalysisJob)
+                        .where(AnalysisJob.owner == self.owner, AnalysisJob.status == "running")
+                        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                    )
+                    await db.commit()
+                for job_id, dedupe_key in await self._reclaim_expired():
+                    self._inflight[dedupe_key] = job_id
+                    self._queue.put_nowait(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # e.g. the database is unreachable: try again next round
+
+    async def _reclaim_expired(self):
+        """
+        Put running jobs whose lease has lapsed (or that predate leases) back
+        to "queued"; returns their (ID, dedupe key) pairs.
+        """
+        now = datetime.utcnow()
+        lapsed = or_(AnalysisJob.lease_expires_at.is_(None), AnalysisJob.lease_expires_at < now)
+        reclaimed = []
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(AnalysisJob.id, AnalysisJob.dedupe_key).where(AnalysisJob.status == "running", lapsed)
+            )
+            for job_id, dedupe_key in rows.all():
+                # Conditional, so a lease renewed (or a job reclaimed by another process) meanwhile is left alone.
+                result = await db.execute(
+                    update(AnalysisJob)
+                    .where(AnalysisJob.id == job_id, AnalysisJob.status == "running", lapsed)
+                    .values(status="queued", owner=None, lease_expires_at=None)
+                )
+                if result.rowcount == 1:
+                    reclaimed.append((job_id, dedupe_key))
+            await db.commit()
+        self.reclaimed += len(reclaimed)
+        return reclaimed
+
+    def _retry_later(self, job_id, attempts, retry_after=None):
+        """
+        Re-queue after an exponential backoff (at least the provider's
+        Retry-After), jittered so retries don't arrive in bursts.
+        """
+        self.retries += 1
+        metrics.inc("analysis_jobs_total", status="retried")
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** (attempts - 1))
+        delay = max(delay / 2 + random.uniform(0, delay / 2), retry_after or 0)
+        loop = asyncio.get_running_loop()
+        self._timers = [timer for timer in self._timers if not timer.cancelled() and timer.when() > loop.time()]
+        self._timers.append(loop.call_later(delay, self._queue.put_nowait, job_id))
+
+
+metrics.describe("analysis_jobs_total", "Background analysis jobs by outcome.")
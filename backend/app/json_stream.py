@@ -0,0 +1,148 @@
+import json
+import re
+
+# === Incremental JSON Array Parser ===
+#
+# Model responses are (mostly) a JSON array of objects, possibly wrapped in
+# prose or a ```json fence. JSONArrayStream is fed the response text chunk by
+# chunk as it streams in and hands back each top-level object of the array as
+# soon as its closing brace arrives, in one linear pass over the text.
+#
+# It is deliberately tolerant of what models actually send back:
+#   - a response cut off by max_tokens still yields every complete object;
+#   - Python-style dicts ('single quotes', True/False/None, trailing commas),
+#     as demonstrated by our own match prompt, are accepted;
+#   - a malformed object is skipped without losing the rest of the array.
+
+# Characters that matter outside strings; everything else is skipped in C.
+_STRUCTURE_RE = re.compile(r"[\"'{}\[\]]")
+# Inside a string only its closing quote and escapes matter.
+_STRING_END_RE = {'"': re.compile(r'[\\"]'), "'": re.compile(r"[\\']")}
+
+
+class JSONArrayStream:
+    """Incrementally extract the objects of the first JSON array in a text stream."""
+
+    def __init__(self):
+        self.started = False   # seen the opening '['
+        self.done = False      # seen the closing ']'
+        self.items = 0         # objects returned so far
+        self._depth = 0        # nesting depth inside the current object
+        self._quote = None     # quote character of the string being scanned
+        self._escape = False   # previous chunk ended with a backslash in a string
+        self._buffer = []      # pieces of the current object from earlier chunks
+
+    def feed(self, chunk):
+        """Consume more text; return the list of objects completed by it."""
+        items = []
+        pos = 0
+        end = len(chunk)
+        item_start = 0 if self._depth else None
+        while pos < end and not self.done:
+            if self._escape:
+                self._escape = False
+                pos += 1
+                continue
+            if self._quote:
+                match = _STRING_END_RE[self._quote].search(chunk, pos)
+                if match is None:
+                    break
+                if match.group() == "\\":
+                    if match.end() >= end:
+                        self._escape = True
+                    pos = match.end() + 1
+                else:
+                    self._quote = None
+                    pos = match.end()
+                continue
+            if not self.started:
+                pos = chunk.find("[", pos)
+                if pos < 0:
+                    break
+                self.started = True
+                pos += 1
+                continue
+
+            match = _STRUCTURE_RE.search(chunk, pos)
+            if match is None:
+                break
+            char = match.group()
+            pos = match.end()
+            if char in "\"'":
+                self._quote = char
+            elif self._depth == 0:
+                # Between array items: only an object start or the array end matter.
+                if char == "{":
+                    self._depth = 1
+                    item_start = match.start()
+                elif char == "]":
+                    if self.items:
+                        self.done = True
+                    else:
+                        # "[see below]" in prose, or an empty array: keep looking.
+                        self.started = False
+            elif char in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._buffer.append(chunk[item_start:pos])
+                    item = loads_lenient("".join(self._buffer))
+                    self._buffer = []
+                    item_start = None
+                    if isinstance(item, dict):
+                        items.append(item)
+                        self.items += 1
+        if self._depth and item_start is not None:
+            self._buffer.append(chunk[item_start:])
+        return items
+
+# === Lenient Loading ===
+
+_LENIENT_TOKEN_RE = re.compile(
+    r'"(?:[^"\\]|\\.)*"'              # JSON string: keep as is
+    r"|'((?:[^'\\]|\\.)*)'"           # single-quoted string
+    r"|\b(True|False|None)\b"         # Python literals
+    r"|,(\s*[}\]])",                  # trailing comma
+    re.DOTALL,
+)
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_UNESCAPED_QUOTE_RE = re.compile(r'(?<!\\)"')
+
+
+def _lenient_token(match):
+    single_quoted, literal, closing = match.groups()
+    if single_quoted is not None:
+        return '"' + _UNESCAPED_QUOTE_RE.sub(r'\\"', single_quoted.replace("\\'", "'")) + '"'
+    if literal is not None:
+        return _PYTHON_LITERALS[literal]
+    if closing is not None:
+        return closing
+    return match.group()
+
+
+def loads_lenient(text):
+    """json.loads, retried with Python-style syntax rewritten to JSON. None if it still fails."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return json.loads(_LENIENT_TOKEN_RE.sub(_lenient_token, text))
+    except ValueError:
+        return None
+
+
+def parse_json_value(text):
+    """
+    The JSON value embedded in `text` (e.g. inside a ```json fence or prose):
+    from the first '{' or '[' to the last matching closer. None if unparsable.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return None
+    start = min(starts)
+    end = text.rfind("}" if text[start] == "{" else "]")
+    if end < start:
+        return None
+    return loads_lenient(text[start:end + 1])
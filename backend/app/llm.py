@@ -0,0 +1,363 @@
+import asyncio
+import json
+import os
+import random
+import re
+
+from app.metrics import span
+from app.prompts import count_tokens
+from app.scoring import term_counts
+
+# === LLM Provider Interface ===
+#
+# Every model call in the app goes through an LLMRouter, which picks a provider
+# and model per pipeline stage ("extract_requirements", "match_requirements",
+# "suggest_questions", ...). Providers:
+#   - OpenAIProvider: the real API.
+#   - FakeProvider: local, deterministic stand-in with configurable latency,
+#     jitter and error rates, for load tests and CI without network access.
+#
+# The openai package takes about a second to import, so it is only loaded when
+# the OpenAI provider is first used (or by LLMRouter.warm_up at startup).
+
+
+class LLMError(Exception):
+    """A model call failed."""
+
+
+class LLMRateLimitError(LLMError):
+    """The provider rejected the call because of rate limits (HTTP 429)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after  # seconds, when the provider said
+
+
+class LLMUsage:
+    __slots__ = ("prompt_tokens", "completion_tokens")
+
+    def __init__(self, prompt_tokens=0, completion_tokens=0):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class LLMResponse:
+    __slots__ = ("content", "usage", "model")
+
+    def __init__(self, content, usage=None, model=None):
+        self.content = content
+        self.usage = usage
+        self.model = model
+
+
+class LLMChunk:
+    """One piece of a streamed response; `usage` is only set on the last chunk."""
+    __slots__ = ("content", "usage")
+
+    def __init__(self, content="", usage=None):
+        self.content = content
+        self.usage = usage
+
+
+class LLMProvider:
+    """Base class: subclasses implement `complete` and `stream`."""
+
+    # Called as listener(model, headers) with the headers of each API response,
+    # so a RateLimitedProvider (app/ratelimit.py) can follow x-ratelimit-*.
+    rate_limit_listener = None
+
+    def warm_up(self):
+        """Load whatever the first call would otherwise load (imports, clients)."""
+
+    async def complete(self, stage, model, messages, **params):
+        """Return an LLMResponse for a chat completion."""
+        raise NotImplementedError
+
+    async def stream(self, stage, model, messages, **params):
+        """Async-iterate LLMChunk objects. Default: one chunk from `complete`."""
+        response = await self.complete(stage, model, messages, **params)
+        yield LLMChunk(response.content, response.usage)
+
+# === OpenAI Provider ===
+
+
+class OpenAIProvider(LLMProvider):
+    def __init__(self, api_key=None):
+        self.api_key = api_key
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import openai
+            self._client = openai.AsyncOpenAI(api_key=self.api_key)
+        return self._client
+
+    def warm_up(self):
+        self.client
+
+    async def _create(self, model, messages, **params):
+        """chat.completions.create, reporting the response headers to rate_limit_listener."""
+        raw = await self.client.chat.completions.with_raw_response.create(model=model, messages=messages, **params)
+        if self.rate_limit_listener is not None:
+            self.rate_limit_listener(model, raw.headers)
+        return raw.parse()
+
+    async def complete(self, stage, model, messages, **params):
+        import openai
+        try:
+            response = await self._create(model, messages, **params)
+        except openai.RateLimitError as e:
+            raise rate_limit_error(e) from e
+        except openai.OpenAIError as e:
+            raise LLMError(str(e)) from e
+        usage = None
+        if response.usage is not None:
+            usage = LLMUsage(response.usage.prompt_tokens, response.usage.completion_tokens)
+        return LLMResponse(response.choices[0].message.content or "", usage, response.model)
+
+    async def stream(self, stage, model, messages, **params):
+        import openai
+        try:
+            stream = await self._create(
+                model,
+                messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **params,
+            )
+            async for chunk in stream:
+                usage = None
+                if chunk.usage is not None:
+                    usage = LLMUsage(chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+                content = (chunk.choices[0].delta.content or "") if chunk.choices else ""
+                if content or usage:
+                    yield LLMChunk(content, usage)
+        except openai.RateLimitError as e:
+            raise rate_limit_error(e) from e
+        except openai.OpenAIError as e:
+            raise LLMError(str(e)) from e
+
+
+def rate_limit_error(error):
+    """LLMRateLimitError for an openai.RateLimitError, with the Retry-After it carried."""
+    from app.ratelimit import parse_duration
+
+    headers = error.response.headers if error.response is not None else {}
+    retry_after = parse_duration(headers.get("retry-after")) or parse_duration(headers.get("x-ratelimit-reset-requests"))
+    return LLMRateLimitError(str(error), retry_after=retry_after)
+
+# === Fake Provider ===
+
+
+class FakeProvider(LLMProvider):
+    """
+    Offline stand-in that answers each stage with schema-valid JSON derived
+    from the prompt itself. Latency is `latency` +/- `jitter` seconds; a call
+    fails with LLMError at `error_rate` and with LLMRateLimitError at
+    `rate_limit_rate`. A `seed` makes runs reproducible.
+    """
+
+    def __init__(self, latency=0.3, jitter=0.1, error_rate=0.0, rate_limit_rate=0.0, seed=None,
+                 chunk_size=16):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.chunk_size = chunk_size
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    async def _simulate(self):
+        self.calls += 1
+        delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        await asyncio.sleep(delay)
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            raise LLMRateLimitError("Fake provider: rate limit exceeded")
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise LLMError("Fake provider: simulated failure")
+
+    async def complete(self, stage, model, messages, **params):
+        await self._simulate()
+        content = self.answer(stage, messages)
+        prompt_tokens = sum(count_tokens(m["content"]) for m in messages)
+        return LLMResponse(content, LLMUsage(prompt_tokens, count_tokens(content)), model)
+
+    async def stream(self, stage, model, messages, **params):
+        response = await self.complete(stage, model, messages, **params)
+        content = response.content
+        for start in range(0, len(content), self.chunk_size):
+            await asyncio.sleep(0)
+            yield LLMChunk(content[start:start + self.chunk_size])
+        yield LLMChunk("", response.usage)
+
+    def answer(self, stage, messages):
+        """Build a plausible JSON answer for `stage` from the user prompt."""
+        prompt = messages[-1]["content"]
+        if stage == "extract_requirements":
+            return json.dumps(self._requirements(_section(prompt, "Job Description:")))
+        if stage == "match_requirements":
+            requirements = _json_after(prompt, "Job requirements:") or []
+            resume_terms = term_counts(_section(prompt, "Candidate resume:"))
+            return json.dumps([self._verdict(r, resume_terms) for r in requirements])
+        if stage == "analyze_resume":
+            resume_terms = term_counts(_section(prompt, "Candidate resume:"))
+            items = []
+            for requirement in self._requirements(_section(prompt, "Job Description:")):
+                verdict = self._verdict(requirement, resume_terms)
+                items.append(dict(requirement, met=verdict["met"], evidence=verdict["explanation"]))
+            return json.dumps({"requirements": items})
+        if stage == "suggest_questions":
+            terms = [term for term, _ in term_counts(_section(prompt, "Job Description:")).most_common(3)]
+            return json.dumps([
+                {"question": f"How does my experience with {term} fit this role?",
+                 "answer": f"The posting emphasises {term}; highlight related work in your resume."}
+                for term in terms
+            ])
+        return "[]"
+
+    def _verdict(self, requirement, resume_terms):
+        title = requirement.get("requirement", "")
+        met = _is_met(title, resume_terms)
+        return {
+            "requirement": title,
+            "met": met,
+            "explanation": "Mentioned in the resume." if met else "Not found in the resume.",
+        }
+
+    def _requirements(self, job_text, limit=8):
+        return [
+            {"requirement": term.title(), "explanation": f"The job description mentions {term}."}
+            for term, _ in term_counts(job_text).most_common(limit)
+        ]
+
+
+def _section(prompt, heading):
+    """Text following `heading` up to the next blank line followed by a heading-like line."""
+    start = prompt.find(heading)
+    if start < 0:
+        return ""
+    text = prompt[start + len(heading):]
+    end = re.search(r"\n\n(?:[A-Z][\w ]+:\n|Return |Extract )", text)
+    return text[:end.start()] if end else text
+
+
+def _json_after(prompt, heading):
+    start = prompt.find(heading)
+    if start < 0:
+        return None
+    line = prompt[start + len(heading):].strip().split("\n", 1)[0]
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def _is_met(requirement, resume_terms):
+    terms = term_counts(requirement)
+    return bool(terms) and all(term in resume_terms for term in terms)
+
+# === Router ===
+
+
+class LLMRouter:
+    """
+    Sends each stage to its configured provider and model, falling back to the
+    default provider/model. Routes are {stage: (provider, model)}; either part
+    may be None to use the default.
+    """
+
+    def __init__(self, provider, model, routes=None):
+        self.provider = provider
+        self.model = model
+        self.routes = routes or {}
+
+    def route(self, stage):
+        provider, model = self.routes.get(stage, (None, None))
+        return provider or self.provider, model or self.model
+
+    def model_for(self, stage):
+        return self.route(stage)[1]
+
+    async def complete(self, stage, messages, **params):
+        provider, model = self.route(stage)
+        with span("llm." + stage):
+            return await provider.complete(stage, model, messages, **params)
+
+    async def stream(self, stage, messages, **params):
+        provider, model = self.route(stage)
+        with span("llm." + stage):
+            async for chunk in provider.stream(stage, model, messages, **params):
+                yield chunk
+
+    def providers(self):
+        return [self.provider] + [provider for provider, _ in self.routes.values() if provider]
+
+    def warm_up(self):
+        for provider in self.providers():
+            provider.warm_up()
+
+    def stats(self):
+        """Stats of the providers that keep any (e.g. rate limiters), by provider class."""
+        return {
+            type(provider).__name__: provider.stats()
+            for provider in self.providers() if hasattr(provider, "stats")
+        }
+
+
+def make_provider(name):
+    """
+    Build a provider by name from environment settings. OpenAI calls go
+    through a RateLimitedProvider starting from LLM_RPM / LLM_TPM; the fake
+    provider only does when LLM_RPM or LLM_TPM is set explicitly.
+    """
+    provider = _base_provider(name)
+    if name == "openai" or os.getenv("LLM_RPM") or os.getenv("LLM_TPM"):
+        from app.ratelimit import RateLimitedProvider
+
+        provider = RateLimitedProvider(
+            provider,
+            rpm=float(os.getenv("LLM_RPM", 500)),
+            tpm=float(os.getenv("LLM_TPM", 200000)),
+            max_wait=float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", 30)),
+            coalesce=os.getenv("LLM_COALESCE", "True") == "True",
+        )
+    return provider
+
+
+def _base_provider(name):
+    if name == "fake":
+        seed = os.getenv("FAKE_LLM_SEED")
+        return FakeProvider(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", 0.3)),
+            jitter=float(os.getenv("FAKE_LLM_JITTER", 0.1)),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", 0)),
+            rate_limit_rate=float(os.getenv("FAKE_LLM_RATE_LIMIT_RATE", 0)),
+            seed=int(seed) if seed else None,
+        )
+    if name == "openai":
+        return OpenAIProvider(api_key=os.getenv("OPENAI_API_KEY"))
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+def router_from_env(stages, default_model):
+    """
+    LLM_PROVIDER / LLM_MODEL set the defaults; LLM_PROVIDER_<STAGE> and
+    LLM_MODEL_<STAGE> (e.g. LLM_MODEL_MATCH_REQUIREMENTS) override one stage.
+    """
+    providers = {}
+
+    def provider(name):
+        if name not in providers:
+            providers[name] = make_provider(name)
+        return providers[name]
+
+    default = provider(os.getenv("LLM_PROVIDER", "openai"))
+    routes = {}
+    for stage in stages:
+        provider_name = os.getenv(f"LLM_PROVIDER_{stage.upper()}")
+        model = os.getenv(f"LLM_MODEL_{stage.upper()}")
+        if provider_name or model:
+            routes[stage] = (provider(provider_name) if provider_name else None, model)
+    return LLMRouter(default, os.getenv("LLM_MODEL", default_model), routes)
@@ -2,117 +2,213 @@
 from dotenv import load_dotenv
 load_dotenv()  # Load secrets from .env for devs
 from fastapi import BackgroundTasks
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-import PyPDF2
-from docx import Document  # <-- New import for Word support
-import openai
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import List, Optional
 import os
-import re
 import json
+import math
+import asyncio
+from contextlib import asynccontextmanager
 
 
 # === Database & Auth Imports ===
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import or_
-from app.auth import hash_password, verify_password
-from app.models import User
-from app.database import get_db
+from sqlalchemy import or_, select
+from app.auth import (
+    AttemptLimiter, PasswordHasher, PasswordHasherBusy, Principal, TooManyAttempts,
+    create_access_token, decode_access_token, needs_rehash,
+)
+from app.settings import settings
+from app.models import User, JobPosting
+from app.database import AsyncSessionLocal, add_missing_columns, async_engine, engine, get_async_db
+from app.pipeline import Pipeline
+from app.cache import (
+    LRUCache, RequirementCache, ResumeCache, ParsedResume, VerdictCache, content_key, requirement_cache_key,
+)
+from app.extraction import ExtractionService, ExtractionError, spool_upload, discard_spooled, file_format
+from app.scoring import LocalScorer, term_counts
+from app import scoring
+from app import prompts
+from app.resume_index import ResumeIndex
+from app.jobs import AnalysisQueue, QueueFull
+from app.prompts import TokenUsage, compact_json, count_tokens, fit_text
+from app.json_stream import JSONArrayStream, parse_json_value
+from app.results import assemble_matches, clean_explanation, pair_verdicts
+from app.entities import local_verdicts
+from app.llm import LLMRateLimitError, router_from_env
+from app.metrics import ServerTimingMiddleware, instrument_engine, metrics, record_tokens, span, traced
 
 # === JWT Handling ===
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from jose import JWTError, jwt
-from datetime import datetime, timedelta
+from jose import JWTError
 import secrets
 
-# === Email Imports for password reset ===
-
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
-from email_validator import validate_email, EmailNotValidError
-
-# Read email config from .env
-MAIL_USERNAME = os.getenv("MAIL_USERNAME")
-MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
-MAIL_FROM = os.getenv("MAIL_FROM")
-MAIL_FROM_NAME = os.getenv("MAIL_FROM_NAME", "TalentMatch")
-MAIL_SERVER = os.getenv("MAIL_SERVER")
-MAIL_PORT = int(os.getenv("MAIL_PORT", 587))
-MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "True") == "True"
-MAIL_SSL_TLS = os.getenv("MAIL_SSL_TLS", "False") == "True"
-
-conf = ConnectionConfig(
-    MAIL_USERNAME=MAIL_USERNAME,
-    MAIL_PASSWORD=MAIL_PASSWORD,
-    MAIL_FROM=MAIL_FROM,
-    MAIL_FROM_NAME=MAIL_FROM_NAME,
-    MAIL_SERVER=MAIL_SERVER,
-    MAIL_PORT=MAIL_PORT,
-    MAIL_STARTTLS=MAIL_STARTTLS,
-    MAIL_SSL_TLS=MAIL_SSL_TLS,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True
+# === Email (password reset) ===
+# fastapi_mail and email_validator are slow to import and only needed to send
+# reset emails, so they are loaded (and the client built) on first use.
+
+_mail_client = None
+
+def mail_client():
+    """FastMail client configured from settings, built on first use."""
+    global _mail_client
+    if _mail_client is None:
+        from fastapi_mail import ConnectionConfig, FastMail
+        _mail_client = FastMail(ConnectionConfig(
+            MAIL_USERNAME=settings.mail_username,
+            MAIL_PASSWORD=settings.mail_password,
+            MAIL_FROM=settings.mail_from,
+            MAIL_FROM_NAME=settings.mail_from_name,
+            MAIL_SERVER=settings.mail_server,
+            MAIL_PORT=settings.mail_port,
+            MAIL_STARTTLS=settings.mail_starttls,
+            MAIL_SSL_TLS=settings.mail_ssl_tls,
+            USE_CREDENTIALS=True,
+            VALIDATE_CERTS=True
+        ))
+    return _mail_client
+
+# === Text Extraction Setup ===
+# PDF/DOCX parsing is CPU-bound, so it runs in a process pool off the event loop.
+# Resume text is capped at EXTRACTION_MAX_CHARS: the prompts are truncated to the
+# model's limits anyway, so parsing stops once the budget is reached.
+
+extraction_service = ExtractionService(
+    workers=int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 1)),
+    timeout=float(os.getenv("EXTRACTION_TIMEOUT", 30)),
+    max_pages=int(os.getenv("EXTRACTION_MAX_PAGES", 50)),
+    max_chars=int(os.getenv("EXTRACTION_MAX_CHARS", 40000)),
+)
+UPLOAD_SPOOL_MAX_MEMORY = int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY", 1024 * 1024))
+
+# Parsed resumes are cached by upload hash, so resubmitting the same file skips parsing.
+resume_cache = ResumeCache(
+    max_entries=int(os.getenv("RESUME_CACHE_SIZE", 2048)),
+    max_bytes=int(os.getenv("RESUME_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    directory=os.getenv("RESUME_CACHE_DIR") or None,
 )
 
+# Stored resumes are searchable through an inverted index persisted on disk.
+resume_index = ResumeIndex(
+    directory=os.getenv("RESUME_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "resume_index")),
+    compact_every=int(os.getenv("RESUME_INDEX_COMPACT_EVERY", 500)),
+)
+
+# Every SQL statement is timed as a "db.<operation>" span (see app/metrics.py).
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 # === Utility Functions ===
 
+@traced("safe_json_parse")
 def safe_json_parse(content):
-    """Try to safely parse a JSON array/object from AI response text."""
-    try:
-        match = re.search(r'\[\s*{.*}\s*\]', content, re.DOTALL)
-        if match:
-            return json.loads(match.group(0))
-        return json.loads(content)
-    except Exception:
-        return [{"requirement": "AI Extraction Error", "explanation": content}]
-
-def extract_text_from_pdf(file):
-    """Extract all text from a PDF file (each page)."""
-    pdf_reader = PyPDF2.PdfReader(file)
-    text = ''
-    for page in pdf_reader.pages:
-        text += page.extract_text() or ''
-    return text
-
-def extract_text_from_docx(file):
-    """Extract all text from a Word (.docx) file."""
-    document = Document(file)
-    return '\n'.join([para.text for para in document.paragraphs])
-
-def extract_text(file: UploadFile):
-    """
-    Extract text from uploaded file.
-    Supports: PDF (.pdf), Word (.docx), and plain text (.txt).
-    """
-    filename = file.filename.lower()
-    if filename.endswith('.pdf'):
-        return extract_text_from_pdf(file.file)
-    elif filename.endswith('.docx'):
-        return extract_text_from_docx(file.file)
-    else:
-        # Treat everything else as plain text
-        return file.file.read().decode("utf-8", errors="ignore")
-
-def clean_explanation(text):
-    """Make AI explanations more readable for users."""
-    text = text.strip()
-    if text and not text[0].isupper():
-        text = text[0].upper() + text[1:]
-    if text and text[-1] not in ".!?":
-        text += "."
-    text = re.sub(r'\s{2,}', ' ', text)
-    text = re.sub(r'(?<![.?!])\n', '. ', text)
-    return text
+    """
+    Try to safely parse a JSON array/object from AI response text.
+    Objects of an array cut off by max_tokens are kept, and Python-style
+    dicts (single quotes, True/False) are accepted.
+    """
+    value = parse_json_value(content)
+    if isinstance(value, list):
+        return value
+    # Truncated or partly malformed arrays, and arrays nested in an object.
+    items = JSONArrayStream().feed(content)
+    if items:
+        return items
+    if value is not None:
+        return value
+    return [{"requirement": "AI Extraction Error", "explanation": content}]
+
+async def parse_resume(filename, source, digest):
+    """
+    Return the ParsedResume for a spooled upload, from the resume cache when
+    the same bytes were parsed before, otherwise via the extraction pool.
+    """
+    key = ResumeCache.key(digest, file_format(filename), extraction_service.max_pages, extraction_service.max_chars)
+    parsed = await resume_cache.get(key)
+    if parsed is None:
+        text = await extraction_service.extract(filename, source)
+        parsed = ParsedResume(text, term_counts(text))
+        await resume_cache.set(key, parsed)
+    return parsed
+
+async def extract_text(file: UploadFile):
+    """Parse an uploaded resume file. Returns a ParsedResume."""
+    with span("extract_text"):
+        source, digest = await spool_upload(file, max_memory=UPLOAD_SPOOL_MAX_MEMORY)
+        try:
+            return await parse_resume(file.filename, source, digest)
+        finally:
+            discard_spooled(source)
 
 # === OPENAI SETUP ===
 
-openai_api_key = os.getenv("OPENAI_API_KEY")
-client = openai.OpenAI(api_key=openai_api_key)
+# All model calls go through `llm`, which routes each stage to a provider and
+# model (see app/llm.py). LLM_PROVIDER=fake swaps in the offline stand-in.
+
 MODEL = "gpt-4.1-nano"
+LLM_STAGES = ("extract_requirements", "match_requirements", "suggest_questions", "analyze_resume")
+llm = router_from_env(LLM_STAGES, MODEL)
+
+# Upper bound on prompt tokens per call; long resumes are trimmed to their most
+# relevant sections to fit. Token counts per stage are reported on /stats/.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 6000))
+token_usage = TokenUsage()
+
+def record_usage(stage, usage, prompt_tokens):
+    """Account one LLM call's tokens in /stats/ and /metrics."""
+    record_tokens(stage, *token_usage.record(stage, usage, prompt_tokens))
+
+def build_messages(system_prompt, user_template, budget=None, **fields):
+    """
+    Fill `user_template` so that the whole prompt fits the token budget.
+    Each field is (text, focus); fields are fitted in order and each one gets
+    what is left of the budget, split evenly with the fields after it.
+    Returns (messages, prompt token count).
+    """
+    budget = budget or PROMPT_TOKEN_BUDGET
+    remaining = budget - count_tokens(system_prompt) - count_tokens(user_template.format(**{name: "" for name in fields}))
+    values = {}
+    names = list(fields)
+    for position, name in enumerate(names):
+        text, focus = fields[name]
+        share = remaining // (len(names) - position)
+        values[name] = fit_text(text, max(share, 0), focus=focus)
+        remaining -= count_tokens(values[name])
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_template.format(**values)},
+    ]
+    return messages, budget - remaining
+
+# === Requirement Cache Setup ===
+# Bump REQUIREMENTS_PROMPT_VERSION whenever the extraction prompt changes,
+# so stale cached requirement lists are not reused.
+
+REQUIREMENTS_PROMPT_VERSION = 1
+requirement_cache = RequirementCache(
+    max_entries=int(os.getenv("REQUIREMENT_CACHE_SIZE", 512)),
+    max_bytes=int(os.getenv("REQUIREMENT_CACHE_MAX_BYTES", 16 * 1024 * 1024)),
+    ttl=int(os.getenv("REQUIREMENT_CACHE_TTL", 7 * 24 * 3600)),
+    persistent=os.getenv("REQUIREMENT_CACHE_DB", "False") == "True",
+)
+
+# === Result Cache Setup ===
+# Verdicts and whole responses for resume x job pairs. Bump MATCH_PROMPT_VERSION
+# whenever the match or Q&A prompt changes.
+
+MATCH_PROMPT_VERSION = 1
+result_cache = VerdictCache(
+    max_entries=int(os.getenv("RESULT_CACHE_SIZE", 1024)),
+    max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    ttl=int(os.getenv("RESULT_CACHE_TTL", 24 * 3600)),
+)
 
 # === Requirement Extraction Functions ===
 
-def extract_requirements_gpt(job_desc):
+async def extract_requirements_gpt(job_desc):
     """Ask OpenAI to extract explicit/implicit requirements from job posting."""
     system_prompt = (
         "Extract a detailed JSON array of all explicit and implicit job requirements from the following job description. "
@@ -120,23 +216,43 @@ def extract_requirements_gpt(job_desc):
         "Only include requirements that could be checked on a resume (e.g., years of experience, education, certifications, security clearance, eligibility, skills, language, work location, schedule, etc). "
         "Format: [{\"requirement\": \"...\", \"explanation\": \"...\"}]"
     )
-    user_prompt = f"Job Description:\n{job_desc}\n\nExtract the requirements as a JSON list."
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        temperature=0.2,
-        max_tokens=800,
+    messages, prompt_tokens = build_messages(
+        system_prompt,
+        "Job Description:\n{job_desc}\n\nExtract the requirements as a JSON list.",
+        job_desc=(job_desc, None),
     )
-    requirements = safe_json_parse(response.choices[0].message.content)
+    response = await llm.complete("extract_requirements", messages, temperature=0.2, max_tokens=800)
+    record_usage("extract_requirements", response.usage, prompt_tokens)
+    requirements = safe_json_parse(response.content)
     return requirements
 
-def match_requirements_gpt(resume_text, requirements):
+def is_extraction_error(requirements):
+    """True if safe_json_parse fell back to its error placeholder."""
+    return isinstance(requirements, list) and any(
+        isinstance(r, dict) and r.get("requirement") == "AI Extraction Error" for r in requirements
+    )
+
+async def get_requirements(job_desc):
+    """
+    Return the requirements for a job description, using the requirement cache
+    so identical postings only pay for one extraction call.
+    """
+    model = llm.model_for("extract_requirements")
+    key = requirement_cache_key(job_desc, model, REQUIREMENTS_PROMPT_VERSION)
+    requirements = await requirement_cache.get(key)
+    if requirements is not None:
+        return requirements
+    requirements = await extract_requirements_gpt(job_desc)
+    if not is_extraction_error(requirements):
+        await requirement_cache.set(key, requirements, model, REQUIREMENTS_PROMPT_VERSION)
+    return requirements
+
+async def match_requirements_gpt(resume_text, requirements, on_item=None):
     """
     Ask OpenAI to compare the parsed requirements and the user's resume,
     and return which requirements are clearly met or missing.
+    With `on_item`, the response is streamed and each verdict is passed to
+    `on_item` as soon as its JSON object is complete.
     """
     system_prompt = (
         "You are a helpful HR assistant. For each job requirement below, check if the candidate resume CLEARLY meets the requirement. "
@@ -147,113 +263,457 @@ def match_requirements_gpt(resume_text, requirements):
         {"requirement": r["requirement"], "explanation": r.get("explanation", "")}
         for r in requirements
     ]
-    user_prompt = (
-        f"Job requirements:\n{json.dumps(req_list, indent=2)}\n\n"
-        f"Candidate resume:\n{resume_text}\n\n"
+    req_json = compact_json(req_list)
+    # Literal braces in the requirement JSON must not be read as format fields.
+    user_template = (
+        "Job requirements:\n" + req_json.replace("{", "{{").replace("}", "}}") + "\n\n"
+        "Candidate resume:\n{resume_text}\n\n"
         "Return a JSON array as specified."
     )
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        temperature=0.2,
-        max_tokens=1800,
+    messages, prompt_tokens = build_messages(
+        system_prompt,
+        user_template,
+        resume_text=(resume_text, req_json),
     )
-    match_results = safe_json_parse(response.choices[0].message.content)
+    if on_item is not None:
+        return await stream_json_array(
+            "match_requirements", messages, prompt_tokens, on_item, temperature=0.2, max_tokens=1800
+        )
+    response = await llm.complete("match_requirements", messages, temperature=0.2, max_tokens=1800)
+    record_usage("match_requirements", response.usage, prompt_tokens)
+    match_results = safe_json_parse(response.content)
     return match_results
 
-def ai_match_score(resume_text, job_text):
-    """Simple overlap score for resume and job text as a backup."""
-    resume_words = set(re.findall(r'\w+', resume_text.lower()))
-    job_words = set(re.findall(r'\w+', job_text.lower()))
-    overlap = resume_words.intersection(job_words)
-    return len(overlap) / (len(job_words) + 1e-5)
+# Structured requirements (years of experience, degrees, certifications,
+# languages, locations, clearance) are decided locally when the resume is clear
+# about them (see app/entities.py); only the rest reach the model.
+LOCAL_MATCH = os.getenv("LOCAL_MATCH", "True") == "True"
+
+async def match_requirements_cached(resume_text, requirements, on_item=None):
+    """
+    match_requirements_gpt through the local matcher and the verdict cache:
+    requirements decided locally, or whose supporting resume sections are
+    unchanged since a cached verdict, skip the model; only the rest are sent
+    to it. Verdicts keep the requirement order.
+    """
+    model = llm.model_for("match_requirements")
+    keys = VerdictCache.verdict_keys(resume_text, requirements, model, MATCH_PROMPT_VERSION)
+    cached = result_cache.get_verdicts(keys)
+    if LOCAL_MATCH:
+        with span("local_match"):
+            local = local_verdicts(resume_text, requirements)
+        cached = [verdict or known for verdict, known in zip(local, cached)]
+    pending = [(key, r) for key, r, verdict in zip(keys, requirements, cached) if verdict is None]
+    if on_item is not None:
+        for verdict in cached:
+            if verdict is not None:
+                on_item(verdict)
+    fresh = []
+    if pending:
+        fresh = await match_requirements_gpt(resume_text, [r for _, r in pending], on_item=on_item)
+    if is_extraction_error(fresh):
+        return [verdict for verdict in cached if verdict is not None] + fresh
+    fresh_verdicts, reworded = pair_verdicts([r for _, r in pending], fresh)
+    remember_verdicts([key for key, _ in pending], fresh_verdicts)
+    fresh_verdicts.reverse()
+    results = []
+    for verdict in cached:
+        if verdict is None:
+            verdict = fresh_verdicts.pop()
+        if verdict is not None:
+            results.append(verdict)
+    # Verdicts the model returned under a reworded requirement title.
+    return results + reworded
+
+def remember_verdicts(keys, verdicts):
+    """Cache each verdict (paired with its requirement by pair_verdicts) under its key."""
+    for key, verdict in zip(keys, verdicts):
+        if verdict is not None:
+            result_cache.set_verdict(key, verdict)
+
+async def stream_json_array(stage, messages, prompt_tokens, on_item, **params):
+    """
+    Stream a chat completion whose answer is a JSON array, calling `on_item`
+    for each array element as it arrives. Returns the full parsed list.
+    """
+    parser = JSONArrayStream()
+    items = []
+    parts = []
+    usage = None
+    async for chunk in llm.stream(stage, messages, **params):
+        if chunk.usage is not None:
+            usage = chunk.usage
+        parts.append(chunk.content)
+        for item in parser.feed(chunk.content):
+            items.append(item)
+            on_item(item)
+    record_usage(stage, usage, prompt_tokens)
+    if not items:
+        # Not an array of objects after all: fall back to the tolerant parser.
+        items = safe_json_parse("".join(parts))
+    return items
+
+async def suggest_questions_gpt(job_text, resume_text):
+    """Ask OpenAI for job-specific questions a candidate might ask, with answers."""
+    system_prompt = (
+        "You are a smart job matching assistant. Analyze the following job description and resume. "
+        "1. Suggest up to 5 very relevant, dynamic, and context-specific questions a candidate might want to ask about their fit or preparation for this job (DO NOT use generic questions; infer from the specific job). "
+        "2. For each question, give a clear answer based on the resume and job description. "
+        "Format your answer as a JSON list like this: "
+        '[{"question": "...", "answer": "..."}]'
+    )
+    messages, prompt_tokens = build_messages(
+        system_prompt,
+        "Job Description:\n{job_text}\n\nResume:\n{resume_text}\n\nReturn only the JSON list.",
+        job_text=(job_text, None),
+        resume_text=(resume_text, job_text),
+    )
+    response = await llm.complete("suggest_questions", messages, temperature=0.3, max_tokens=700)
+    record_usage("suggest_questions", response.usage, prompt_tokens)
+    return safe_json_parse(response.content)
+
+# === Single-Pass Analysis ===
+# PIPELINE_MODE=single_pass (or the pipeline_mode form field) replaces the
+# extract -> match chain with one structured-output call that returns the
+# requirements together with their verdicts: one model round-trip instead of
+# two, and the requirement list is not sent back to the model.
+
+PIPELINE_MODES = ("two_stage", "single_pass")
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "two_stage")
+
+ANALYSIS_SCHEMA = {
+    "name": "requirement_analysis",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "requirements": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "requirement": {"type": "string"},
+                        "explanation": {"type": "string"},
+                        "met": {"type": "boolean"},
+                        "evidence": {"type": "string"},
+                    },
+                    "required": ["requirement", "explanation", "met", "evidence"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["requirements"],
+        "additionalProperties": False,
+    },
+}
+
+async def analyze_resume_gpt(resume_text, job_text, on_item=None):
+    """
+    Extract the job requirements and judge the resume against them in a single
+    call. Returns (requirements, match_results) in the same shapes as
+    extract_requirements_gpt and match_requirements_gpt.
+    With `on_item`, each verdict is passed to `on_item` as soon as it arrives.
+    """
+    system_prompt = (
+        "You are a helpful HR assistant. From the job description, extract all explicit and implicit job requirements "
+        "that could be checked on a resume (e.g., years of experience, education, certifications, security clearance, eligibility, skills, language, work location, schedule, etc). "
+        "For each requirement give 'requirement' (a short title), 'explanation' (concise reason/context for why it's needed), "
+        "'met' (true only if the candidate resume CLEARLY meets it) and 'evidence' (a very short explanation of the verdict). "
+        "Be strict—if the requirement is not CLEARLY met in the resume, set 'met': false."
+    )
+    messages, prompt_tokens = build_messages(
+        system_prompt,
+        "Job Description:\n{job_desc}\n\nCandidate resume:\n{resume_text}\n\nReturn the requirements with their verdicts.",
+        job_desc=(job_text, None),
+        resume_text=(resume_text, job_text),
+    )
+    params = {
+        "temperature": 0.2,
+        "max_tokens": 2400,
+        "response_format": {"type": "json_schema", "json_schema": ANALYSIS_SCHEMA},
+    }
+    if on_item is not None:
+        def on_verdict(item):
+            on_item(verdict_from_analysis(item))
+        items = await stream_json_array("analyze_resume", messages, prompt_tokens, on_verdict, **params)
+    else:
+        response = await llm.complete("analyze_resume", messages, **params)
+        record_usage("analyze_resume", response.usage, prompt_tokens)
+        items = safe_json_parse(response.content)
+    if isinstance(items, dict):
+        items = items.get("requirements", [])
+    if is_extraction_error(items):
+        return items, []
+    requirements = [
+        {"requirement": item["requirement"], "explanation": item.get("explanation", "")}
+        for item in items
+    ]
+    return requirements, [verdict_from_analysis(item) for item in items]
+
+def verdict_from_analysis(item):
+    """A single-pass item in the shape of a match_requirements_gpt verdict."""
+    return {"requirement": item.get("requirement", ""), "met": item.get("met"), "explanation": item.get("evidence", "")}
+
+async def single_pass_analysis(resume_text, job_text, on_item=None):
+    """
+    Requirements and verdicts for a job, from one analyze_resume_gpt call.
+    Jobs whose requirements are already cached only need the match call.
+    The extracted requirements are cached for later two-stage requests.
+    """
+    model = llm.model_for("analyze_resume")
+    key = requirement_cache_key(job_text, model, REQUIREMENTS_PROMPT_VERSION)
+    requirements = await requirement_cache.get(key)
+    if requirements is not None:
+        return requirements, await match_requirements_cached(resume_text, requirements, on_item=on_item)
+    requirements, match_results = await analyze_resume_gpt(resume_text, job_text, on_item=on_item)
+    if requirements and not is_extraction_error(requirements):
+        await requirement_cache.set(key, requirements, model, REQUIREMENTS_PROMPT_VERSION)
+        keys = VerdictCache.verdict_keys(resume_text, requirements, model, MATCH_PROMPT_VERSION)
+        remember_verdicts(keys, pair_verdicts(requirements, match_results)[0])
+    return requirements, match_results
+
+def resolve_pipeline_mode(pipeline_mode, requirements):
+    """
+    Pipeline mode for one request: the pipeline_mode field, else PIPELINE_MODE.
+    Requests that already have requirements (stored job postings) always use
+    the two-stage path, which then only makes the match call.
+    """
+    mode = pipeline_mode or PIPELINE_MODE
+    if mode not in PIPELINE_MODES:
+        raise HTTPException(status_code=400, detail=f"pipeline_mode must be one of: {', '.join(PIPELINE_MODES)}.")
+    return "two_stage" if requirements is not None else mode
+
+# Job-side TF-IDF vectors, built once per job text. IDF weights come from the
+# stored resumes (the resume index), so terms every resume has count for
+# little; scorers are refitted after JOB_SCORER_CACHE_TTL as the index grows.
+job_scorers = LRUCache(
+    max_entries=int(os.getenv("JOB_SCORER_CACHE_SIZE", 256)),
+    ttl=int(os.getenv("JOB_SCORER_CACHE_TTL", 600)),
+)
+
+def job_scorer(job_text):
+    """LocalScorer fitted on one job description, from the job scorer cache when possible."""
+    key = content_key(job_text)
+    scorer = job_scorers.get(key)
+    if scorer is None:
+        scorer = LocalScorer([term_counts(job_text)], corpus=resume_index)
+        job_scorers.set(key, scorer)
+    return scorer
+
+def ai_match_score(resume_text, job_text, resume_terms=None):
+    """Local TF-IDF similarity (0 to 1) between a resume and a job description."""
+    if resume_terms is None:
+        resume_terms = term_counts(resume_text)
+    return float(job_scorer(job_text).score([resume_terms])[0, 0])
+
+# === Analysis Pipeline ===
+# Q&A suggestions and the local score only need the raw texts, so they run
+# alongside the extract -> match chain; total latency is the longest chain.
+# In single-pass mode that chain is a single "analysis" call.
+
+def analysis_requirements(analysis):
+    return analysis[0]
+
+def analysis_match_results(analysis):
+    return analysis[1]
+
+def build_analysis_pipeline(on_match_item=None, mode="two_stage"):
+    """
+    Wire up the analysis stages for a pipeline mode. `on_match_item` streams
+    the match call and receives each requirement verdict as it arrives.
+    """
+    pipeline = Pipeline(inputs=("resume_text", "job_text"))
+    if mode == "single_pass":
+        async def analysis(resume_text, job_text):
+            return await single_pass_analysis(resume_text, job_text, on_item=on_match_item)
+        (
+            pipeline
+            .add("analysis", analysis, deps=("resume_text", "job_text"))
+            .add("requirements", analysis_requirements, deps=("analysis",))
+            .add("match_results", analysis_match_results, deps=("analysis",))
+        )
+    else:
+        match = match_requirements_cached
+        if on_match_item is not None:
+            async def match(resume_text, requirements):
+                return await match_requirements_cached(resume_text, requirements, on_item=on_match_item)
+        (
+            pipeline
+            .add("requirements", get_requirements, deps=("job_text",))
+            .add("match_results", match, deps=("resume_text", "requirements"))
+        )
+    return (
+        pipeline
+        .add("resume_terms", term_counts, deps=("resume_text",))
+        .add("score", ai_match_score, deps=("resume_text", "job_text", "resume_terms"))
+        .add("ai_suggestions", suggest_questions_gpt, deps=("job_text", "resume_text"))
+    )
+
+analysis_pipelines = {mode: build_analysis_pipeline(mode=mode) for mode in PIPELINE_MODES}
+
+# === Background Analysis Queue ===
+# POST /analyses/ parses the resume, stores the job and answers at once; a
+# bounded pool of workers runs the analysis (see app/jobs.py), and clients poll
+# GET /analyses/{id}. ANALYSIS_WORKERS caps how many analyses talk to the
+# model at once; rate-limited jobs are retried with exponential backoff.
+
+async def run_analysis_job(payload):
+    return await run_analysis(payload["resume_text"], payload["job_text"], payload["requirements"], mode=payload["mode"])
+
+analysis_queue = AnalysisQueue(
+    run_analysis_job,
+    workers=int(os.getenv("ANALYSIS_WORKERS", 4)),
+    max_pending=int(os.getenv("ANALYSIS_MAX_PENDING", 1000)),
+    max_attempts=int(os.getenv("ANALYSIS_MAX_ATTEMPTS", 5)),
+    retry_delay=float(os.getenv("ANALYSIS_RETRY_DELAY", 2.0)),
+    max_retry_delay=float(os.getenv("ANALYSIS_MAX_RETRY_DELAY", 60.0)),
+    lease_seconds=float(os.getenv("ANALYSIS_LEASE_SECONDS", 60.0)),
+)
 
 # === FASTAPI APPLICATION SETUP ===
 
-app = FastAPI()
+async def warm_up():
+    """
+    Load what the first requests would otherwise wait for: the OpenAI client,
+    the tokenizer, scipy and the extraction worker processes. Runs after startup, so the app
+    accepts requests meanwhile (an early request just loads what it needs itself).
+    """
+    with span("startup.warm_up"):
+        # In-process imports first: every analysis needs them, while only
+        # PDF/DOCX uploads need the (CPU-heavy to spawn) extraction workers.
+        await asyncio.gather(
+            asyncio.to_thread(llm.warm_up), asyncio.to_thread(scoring.warm_up), asyncio.to_thread(prompts.warm_up)
+        )
+        await extraction_service.warm_up()
+
+@asynccontextmanager
+async def lifespan(app):
+    async with async_engine.begin() as connection:
+        await connection.run_sync(add_missing_columns, User.__table__, ("password_version",))
+    await asyncio.to_thread(resume_index.load)
+    await analysis_queue.start()
+    warm_up_task = asyncio.create_task(warm_up()) if settings.warm_up else None
+    yield
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    await analysis_queue.stop()
+    extraction_service.shutdown()
+    password_hasher.shutdown()
+    await asyncio.to_thread(resume_index.compact)
+    await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],  # Change in prod!
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+# Per-stage timings on every response (Server-Timing header) and /metrics.
+app.add_middleware(ServerTimingMiddleware)
 
 # === Resume Upload & Analysis Endpoint ===
 
+def analysis_inputs(resume_text, job_text, requirements=None, resume_terms=None):
+    inputs = {"resume_text": resume_text, "job_text": job_text}
+    if requirements is not None:
+        inputs["requirements"] = requirements
+    if resume_terms is not None:
+        inputs["resume_terms"] = resume_terms
+    return inputs
+
+def build_analysis_response(results):
+    """Shape pipeline results into the /upload-resume/ response payload."""
+    summary = assemble_matches(results["requirements"], results["match_results"])
+    return {
+        "scores": [results["score"]],
+        **summary.response_fields(),
+        "ai_suggestions": results["ai_suggestions"],
+    }
+
+async def cached_requirements(job_text, mode):
+    """Requirements for a job if they are already cached (no model call), else None."""
+    stage = "analyze_resume" if mode == "single_pass" else "extract_requirements"
+    return await requirement_cache.get(
+        requirement_cache_key(job_text, llm.model_for(stage), REQUIREMENTS_PROMPT_VERSION)
+    )
+
+def analysis_response_key(resume_text, job_text, requirements):
+    models = "|".join(llm.model_for(stage) for stage in ("match_requirements", "suggest_questions"))
+    version = f"{REQUIREMENTS_PROMPT_VERSION}.{MATCH_PROMPT_VERSION}"
+    return VerdictCache.response_key(resume_text, requirements, job_text, models, version)
+
+def has_ai_errors(results):
+    return any(is_extraction_error(results[name]) for name in ("requirements", "match_results", "ai_suggestions"))
+
+async def run_analysis(resume_text, job_text, requirements=None, resume_terms=None, mode="two_stage"):
+    """
+    Run the full analysis pipeline and build the response payload.
+    Pass `requirements` or `resume_terms` to reuse already computed values.
+    A resume already analysed against the same requirements is answered from
+    the result cache without any model call.
+    """
+    if requirements is None:
+        requirements = await cached_requirements(job_text, mode)
+    if requirements is not None:
+        mode = "two_stage"
+        response = result_cache.get_response(analysis_response_key(resume_text, job_text, requirements))
+        if response is not None:
+            return response
+    results = await analysis_pipelines[mode].run(**analysis_inputs(resume_text, job_text, requirements, resume_terms))
+    response = build_analysis_response(results)
+    if not has_ai_errors(results):
+        result_cache.set_response(analysis_response_key(resume_text, job_text, results["requirements"]), response)
+    return response
+
+async def get_job_posting(db, job_id):
+    """Load a stored job posting or raise 404."""
+    posting = await db.get(JobPosting, job_id)
+    if not posting:
+        raise HTTPException(status_code=404, detail="Job posting not found.")
+    return posting
+
+async def resolve_job(job_description, job_id):
+    """
+    Return (job text, stored requirements or None) from either a job description
+    or the ID of a stored job posting. The posting is read in its own short
+    session, so no pooled connection is held while the analysis runs.
+    """
+    if job_id is not None:
+        async with AsyncSessionLocal() as db:
+            posting = await get_job_posting(db, job_id)
+        return posting.description, posting.requirement_list()
+    if not job_description:
+        raise HTTPException(status_code=400, detail="Provide either job_description or job_id.")
+    return job_description, None
+
 @app.post("/upload-resume/")
 async def upload_resume(
     resume: UploadFile = File(...),
-    job_description: str = Form(...)
+    job_description: Optional[str] = Form(None),
+    job_id: Optional[int] = Form(None),
+    pipeline_mode: Optional[str] = Form(None),
 ):
     """
-    Receive user's resume file and job description,
-    extract requirements and match using AI, return match data.
+    Receive user's resume file and either a job description or the ID of a
+    stored job posting, extract requirements and match using AI, return match data.
+    `pipeline_mode` ("two_stage" or "single_pass") overrides PIPELINE_MODE.
     """
-    try:
-        resume_text = extract_text(resume)
-        job_text = job_description
-
-        requirements = extract_requirements_gpt(job_text)
-        match_results = match_requirements_gpt(resume_text, requirements)
-
-        met_requirements = []
-        missing_requirements = []
-        requirement_explanations = {}
-
-        for r in match_results:
-            req = r["requirement"]
-            orig_expl = next((x.get("explanation") for x in requirements if x["requirement"] == req), "")
-            ai_expl = r.get("explanation", "")
-            explanation = orig_expl
-            if ai_expl:
-                if explanation and not explanation.endswith("."):
-                    explanation += "."
-                if explanation:
-                    explanation += " "
-                explanation += ai_expl
-            explanation = clean_explanation(explanation)
-            requirement_explanations[req] = explanation
-            if r.get("met") is True or str(r.get("met")).lower() == "true":
-                met_requirements.append(req)
-            else:
-                missing_requirements.append(req)
-
-        score = ai_match_score(resume_text, job_text)
+    job_description, requirements = await resolve_job(job_description, job_id)
+    mode = resolve_pipeline_mode(pipeline_mode, requirements)
 
-        # Extra AI Q&A for user guidance
-        system_prompt = (
-            "You are a smart job matching assistant. Analyze the following job description and resume. "
-            "1. Suggest up to 5 very relevant, dynamic, and context-specific questions a candidate might want to ask about their fit or preparation for this job (DO NOT use generic questions; infer from the specific job). "
-            "2. For each question, give a clear answer based on the resume and job description. "
-            "Format your answer as a JSON list like this: "
-            '[{"question": "...", "answer": "..."}]'
-        )
-        user_prompt = (
-            f"Job Description:\n{job_text}\n\nResume:\n{resume_text}\n\n"
-            "Return only the JSON list."
-        )
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.3,
-            max_tokens=700,
+    try:
+        parsed = await extract_text(resume)
+        return await run_analysis(parsed.text, job_description, requirements, resume_terms=parsed.terms, mode=mode)
+    except LLMRateLimitError as e:
+        # Throttled, not failed: tell the client when to retry instead of a zero score.
+        raise HTTPException(
+            status_code=503,
+            detail="The AI service is busy, please try again shortly.",
+            headers={"Retry-After": str(math.ceil(e.retry_after or 5))},
         )
-        ai_suggestions = safe_json_parse(response.choices[0].message.content)
-
-        return {
-            "scores": [score],
-            "met_requirements": met_requirements,
-            "missing_requirements": missing_requirements,
-            "requirement_explanations": requirement_explanations,
-            "ai_suggestions": ai_suggestions,
-        }
     except Exception as e:
         return {
             "scores": [0.0],
@@ -263,60 +723,528 @@ async def upload_resume(
             "ai_suggestions": [{"question": "Error", "answer": str(e)}],
         }
 
+# === Streaming Analysis Endpoint (Server-Sent Events) ===
+# Same analysis as /upload-resume/, but every stage is pushed to the client as
+# soon as it finishes: parsed text stats, local score, requirements, each
+# requirement verdict while the match call is still streaming, the verdict
+# summary, Q&A suggestions and finally the complete response.
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+STREAMED_STAGES = {"requirements", "score", "ai_suggestions"}
+
+async def stream_analysis(filename, source, digest, job_text, requirements, mode="two_stage"):
+    try:
+        parsed = await parse_resume(filename, source, digest)
+    except Exception as e:
+        yield sse_event("error", {"error": str(e)})
+        return
+    finally:
+        discard_spooled(source)
+    yield sse_event("parsed", {
+        "filename": filename,
+        "characters": len(parsed.text),
+        "terms": sum(parsed.terms.values()),
+        "distinct_terms": len(parsed.terms),
+    })
+    if requirements is not None:
+        yield sse_event("requirements", requirements)
+
+    events = asyncio.Queue()
+    pipeline = build_analysis_pipeline(on_match_item=lambda item: events.put_nowait(("match", item)), mode=mode)
+
+    async def run():
+        try:
+            results = await pipeline.run(
+                on_complete=lambda name, result: events.put_nowait((name, result)),
+                **analysis_inputs(parsed.text, job_text, requirements, parsed.terms),
+            )
+            events.put_nowait(("done", results))
+        except Exception as e:
+            events.put_nowait(("error", e))
+
+    task = asyncio.ensure_future(run())
+    try:
+        while True:
+            name, value = await events.get()
+            if name == "done":
+                yield sse_event("done", build_analysis_response(value))
+                break
+            if name == "error":
+                yield sse_event("error", {"error": str(value)})
+                break
+            if name == "requirements":
+                requirements = value
+            if name == "match":
+                yield sse_event("match", value)
+            elif name == "match_results":
+                yield sse_event("matches", assemble_matches(requirements, value).response_fields())
+            elif name in STREAMED_STAGES:
+                yield sse_event(name, value)
+    finally:
+        # Client went away mid-stream: stop paying for the remaining calls.
+        task.cancel()
+
+@app.post("/upload-resume/stream")
+async def upload_resume_stream(
+    resume: UploadFile = File(...),
+    job_description: Optional[str] = Form(None),
+    job_id: Optional[int] = Form(None),
+    pipeline_mode: Optional[str] = Form(None),
+):
+    """Streaming variant of /upload-resume/ that sends each stage as a Server-Sent Event."""
+    job_description, requirements = await resolve_job(job_description, job_id)
+    mode = resolve_pipeline_mode(pipeline_mode, requirements)
+    # Spool the upload now: it is closed once this handler returns.
+    source, digest = await spool_upload(resume, max_memory=UPLOAD_SPOOL_MAX_MEMORY)
+    return StreamingResponse(
+        stream_analysis(resume.filename, source, digest, job_description, requirements, mode),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# === Asynchronous Analysis Endpoints ===
+
+@app.post("/analyses/", status_code=202)
+async def submit_analysis(
+    resume: UploadFile = File(...),
+    job_description: Optional[str] = Form(None),
+    job_id: Optional[int] = Form(None),
+    pipeline_mode: Optional[str] = Form(None),
+):
+    """
+    Queue the same analysis as /upload-resume/ and return its job ID at once.
+    Resubmitting identical inputs while the first job is still queued or
+    running returns the existing job.
+    """
+    job_description, requirements = await resolve_job(job_description, job_id)
+    mode = resolve_pipeline_mode(pipeline_mode, requirements)
+    try:
+        parsed = await extract_text(resume)
+    except ExtractionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    payload = {"resume_text": parsed.text, "job_text": job_description, "requirements": requirements, "mode": mode}
+    dedupe_key = content_key(mode, parsed.text, job_description, json.dumps(requirements, sort_keys=True))
+    try:
+        analysis_id, deduplicated = await analysis_queue.submit(dedupe_key, payload)
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Too many analyses waiting, please try again later.",
+                            headers={"Retry-After": "30"})
+    return {"id": analysis_id, "status_url": f"/analyses/{analysis_id}", "deduplicated": deduplicated}
+
+@app.get("/analyses/{analysis_id}")
+async def read_analysis(analysis_id: str):
+    """Status of a queued analysis; `result` holds the /upload-resume/ response once done."""
+    job = await analysis_queue.get(analysis_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analysis not found.")
+    return job.to_dict()
+
+# === Job Posting Registry ===
+
+@app.post("/job-postings/")
+async def create_job_posting(
+    job_description: str = Form(...),
+    title: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Ingest a job posting once: extract its requirements and store them,
+    so later uploads can reference it by ID instead of resending the text.
+    """
+    requirements = await get_requirements(job_description)
+    if is_extraction_error(requirements):
+        raise HTTPException(status_code=502, detail="Could not extract requirements from the job description.")
+    posting = JobPosting(
+        title=title,
+        description=job_description,
+        requirements=json.dumps(requirements),
+    )
+    db.add(posting)
+    await db.commit()
+    return {"id": posting.id, "title": posting.title, "requirements": requirements}
+
+@app.get("/job-postings/{job_id}")
+async def read_job_posting(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Return a stored job posting and its extracted requirements."""
+    posting = await get_job_posting(db, job_id)
+    return {
+        "id": posting.id,
+        "title": posting.title,
+        "description": posting.description,
+        "requirements": posting.requirement_list(),
+        "created_at": posting.created_at,
+    }
+
+# === Batch Screening Endpoint ===
+# Many resumes against one job: requirements are extracted once, files are parsed
+# on the extraction worker pool, every resume is ranked by the local scorer and
+# only the top BATCH_LLM_TOP_K go to LLM matching, under a concurrency limit.
+# One bad file or failed call only affects its own result line.
+
+BATCH_MATCH_CONCURRENCY = int(os.getenv("BATCH_MATCH_CONCURRENCY", 8))
+BATCH_LLM_TOP_K = int(os.getenv("BATCH_LLM_TOP_K", 50))
+
+async def parse_candidate(filename, source, digest):
+    """Parse one resume from a batch, returning the exception instead of raising."""
+    try:
+        return await parse_resume(filename, source, digest)
+    except Exception as e:
+        return e
+
+async def match_candidate(index, filename, parsed, score, requirements, match_limit):
+    """LLM-match one shortlisted resume from a batch. Never raises."""
+    try:
+        async with match_limit:
+            match_results = await match_requirements_cached(parsed.text, requirements)
+        summary = assemble_matches(requirements, match_results)
+        return {
+            "type": "result",
+            "index": index,
+            "filename": filename,
+            "score": score,
+            "shortlisted": True,
+            "match_ratio": summary.match_ratio,
+            **summary.response_fields(),
+        }
+    except Exception as e:
+        return {"type": "error", "index": index, "filename": filename, "error": str(e)}
+
+def rank_candidates(results):
+    """
+    Order screened candidates: LLM-matched ones first by share of requirements met,
+    then everyone by local score.
+    """
+    ranked = sorted(
+        results,
+        key=lambda r: (r["shortlisted"], r["match_ratio"] or 0.0, r["score"]),
+        reverse=True,
+    )
+    return [
+        {
+            "rank": rank,
+            "index": r["index"],
+            "filename": r["filename"],
+            "shortlisted": r["shortlisted"],
+            "match_ratio": r["match_ratio"],
+            "score": r["score"],
+        }
+        for rank, r in enumerate(ranked, start=1)
+    ]
+
+async def stream_batch_screening(files, job_text, requirements, top_k):
+    """
+    Yield NDJSON lines: requirements, one line per candidate as it finishes, then a ranked summary.
+    `files` is a list of (filename, spooled source, digest), discarded once the stream ends.
+    """
+    try:
+        async for line in _stream_batch_screening(files, job_text, requirements, top_k):
+            yield line
+    finally:
+        for _, source, _ in files:
+            discard_spooled(source)
+
+async def _stream_batch_screening(files, job_text, requirements, top_k):
+    if requirements is None:
+        requirements = await get_requirements(job_text)
+        if is_extraction_error(requirements):
+            yield json.dumps({"type": "error", "error": "Could not extract requirements from the job description."}) + "\n"
+            return
+    yield json.dumps({"type": "requirements", "requirements": requirements}) + "\n"
+
+    parsed_files = await asyncio.gather(*[
+        parse_candidate(filename, source, digest) for filename, source, digest in files
+    ])
+    candidates = []
+    errors = 0
+    for index, ((filename, _, _), parsed) in enumerate(zip(files, parsed_files)):
+        if isinstance(parsed, Exception):
+            errors += 1
+            yield json.dumps({"type": "error", "index": index, "filename": filename, "error": str(parsed)}) + "\n"
+        else:
+            candidates.append((index, filename, parsed))
+
+    # Rank everyone locally in one pass; only the top_k go to the LLM.
+    results = []
+    shortlist, scores = set(), []
+    if candidates:
+        resume_terms = [parsed.terms for _, _, parsed in candidates]
+        scorer = LocalScorer([term_counts(job_text)], corpus_terms=resume_terms, corpus=resume_index)
+        shortlist, scores = scorer.top_k(resume_terms, top_k)
+        shortlist = set(shortlist)
+    for position, (index, filename, parsed) in enumerate(candidates):
+        if position not in shortlist:
+            item = {
+                "type": "result",
+                "index": index,
+                "filename": filename,
+                "score": float(scores[position]),
+                "shortlisted": False,
+                "match_ratio": None,
+            }
+            results.append(item)
+            yield json.dumps(item) + "\n"
+
+    match_limit = asyncio.Semaphore(BATCH_MATCH_CONCURRENCY)
+    tasks = [
+        asyncio.ensure_future(match_candidate(index, filename, parsed, float(scores[position]), requirements, match_limit))
+        for position, (index, filename, parsed) in enumerate(candidates)
+        if position in shortlist
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            if item["type"] == "result":
+                results.append(item)
+            else:
+                errors += 1
+            yield json.dumps(item) + "\n"
+    finally:
+        # Client went away mid-stream: stop paying for the remaining calls.
+        for task in tasks:
+            task.cancel()
+
+    yield json.dumps({
+        "type": "summary",
+        "total": len(files),
+        "screened": len(results),
+        "shortlisted": len(tasks),
+        "errors": errors,
+        "ranking": rank_candidates(results),
+    }) + "\n"
+
+@app.post("/batch-screen/")
+async def batch_screen(
+    resumes: List[UploadFile] = File(...),
+    job_description: Optional[str] = Form(None),
+    job_id: Optional[int] = Form(None),
+    top_k: Optional[int] = Form(None),
+):
+    """
+    Screen many resumes against one job description (or stored job posting).
+    Every resume is ranked locally; the best `top_k` are matched by the LLM.
+    Streams results back as NDJSON while each candidate finishes.
+    """
+    if top_k is None:
+        top_k = BATCH_LLM_TOP_K
+    if top_k < 0:
+        raise HTTPException(status_code=400, detail="top_k must not be negative.")
+    job_description, requirements = await resolve_job(job_description, job_id)
+
+    # Spool the uploads now: they are closed once this handler returns.
+    files = []
+    try:
+        for resume in resumes:
+            source, digest = await spool_upload(resume, max_memory=UPLOAD_SPOOL_MAX_MEMORY)
+            files.append((resume.filename, source, digest))
+    except Exception:
+        for _, source, _ in files:
+            discard_spooled(source)
+        raise
+    return StreamingResponse(
+        stream_batch_screening(files, job_description, requirements, top_k),
+        media_type="application/x-ndjson",
+    )
+
+# === Resume Store & Candidate Search ===
+
+@app.post("/resumes/")
+async def store_resume(resume: UploadFile = File(...)):
+    """
+    Parse a resume and add it to the searchable resume store.
+    Uploading the same file again returns the existing resume ID.
+    """
+    try:
+        source, digest = await spool_upload(resume, max_memory=UPLOAD_SPOOL_MAX_MEMORY)
+        try:
+            parsed = await parse_resume(resume.filename, source, digest)
+        finally:
+            discard_spooled(source)
+    except ExtractionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    resume_id = await asyncio.to_thread(resume_index.add, dict(parsed.terms), resume.filename, digest)
+    return resume_index.describe(resume_id)
+
+async def search_candidates(job_text, k):
+    """Top-k stored resumes for a job description, scored over the inverted index."""
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1.")
+    hits = await asyncio.to_thread(resume_index.search, term_counts(job_text), k)
+    return [dict(resume_index.describe(resume_id), score=score) for resume_id, score in hits]
+
+@app.get("/job-postings/{job_id}/candidates")
+async def find_candidates_for_posting(job_id: int, k: int = 10):
+    """Return the stored resumes that best match a stored job posting."""
+    job_text, _ = await resolve_job(None, job_id)
+    return {"job_id": job_id, "candidates": await search_candidates(job_text, k)}
+
+@app.post("/candidates/search/")
+async def find_candidates(job_description: str = Form(...), k: int = Form(10)):
+    """Return the stored resumes that best match a job description."""
+    return {"candidates": await search_candidates(job_description, k)}
+
+# === Cache Statistics Endpoint ===
+
+@app.get("/stats/")
+def read_stats():
+    """Hit/miss counters for the in-process caches and text extraction timings."""
+    return {
+        "requirement_cache": requirement_cache.stats(),
+        "resume_cache": resume_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "job_scorers": job_scorers.stats(),
+        "extraction": extraction_service.stats(),
+        "resume_index": resume_index.stats(),
+        "password_hasher": password_hasher.stats(),
+        "auth_attempts": auth_attempts.stats(),
+        "analysis_queue": analysis_queue.stats(),
+        "llm_usage": token_usage.stats(),
+        "llm_rate_limits": llm.stats(),
+    }
+
+# === Metrics Endpoint (Prometheus) ===
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """Stage latency histograms, error and token counters, and cache gauges."""
+    return PlainTextResponse(
+        metrics.render({
+            "requirement_cache": requirement_cache.stats(),
+            "resume_cache": resume_cache.stats(),
+            "result_cache": result_cache.stats(),
+            "job_scorers": job_scorers.stats(),
+            "extraction": extraction_service.stats(),
+            "resume_index": resume_index.stats(),
+            "password_hasher": password_hasher.stats(),
+            "auth_attempts": auth_attempts.stats(),
+            "analysis_queue": analysis_queue.stats(),
+            "llm_rate_limits": llm.stats(),
+        }),
+        media_type="text/plain; version=0.0.4",
+    )
+
+# === Password Hashing and Admission Control ===
+# bcrypt runs on its own bounded executor (see app.auth.PasswordHasher) so
+# login storms cannot starve the threadpool that serves uploads. Attempts are
+# admitted per client IP before any hashing happens; an account's own bucket
+# is only spent by failed logins, so other clients cannot lock it out.
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
+auth_attempts = AttemptLimiter(
+    per_minute=settings.auth_attempts_per_minute,
+    burst=settings.auth_attempts_burst,
+)
+
+def admit_attempt(request, user=None):
+    """
+    Reject (429) clients that exceed the attempt rate, or logins to `user`
+    after too many recent failed ones. Only the client's attempt is taken.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    try:
+        if user is None:
+            auth_attempts.admit("ip:" + client_ip)
+        else:
+            auth_attempts.check("user:%s" % user.id)
+    except TooManyAttempts as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, please try again later.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+def record_failed_login(user):
+    """Spend an attempt from `user`'s bucket after a wrong password."""
+    auth_attempts.charge("user:%s" % user.id)
+
+async def run_password_op(operation, *args):
+    """Run a PasswordHasher operation, answering 503 when its queue is full."""
+    try:
+        return await operation(*args)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please try again.", headers={"Retry-After": "1"})
+
 # === USER REGISTRATION ENDPOINT ===
 
+async def find_user(db, *conditions):
+    """First user matching all `conditions`, or None."""
+    result = await db.execute(select(User).where(*conditions).limit(1))
+    return result.scalars().first()
+
 @app.post("/register/")
-def register_user(
+async def register_user(
+    request: Request,
     username: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Register a new user account (requires unique username and email).
     """
-    if db.query(User).filter(User.username == username).first():
+    admit_attempt(request)
+    if await find_user(db, User.username == username):
         raise HTTPException(status_code=400, detail="Username already registered")
-    if db.query(User).filter(User.email == email).first():
+    if await find_user(db, User.email == email):
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_pw = hash_password(password)
+    hashed_pw = await run_password_op(password_hasher.hash, password)
     new_user = User(username=username, email=email, hashed_password=hashed_pw)
     db.add(new_user)
     try:
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Registration failed")
     return {"id": new_user.id, "username": new_user.username, "email": new_user.email}
 
 # === USER LOGIN ENDPOINT ===
 
 @app.post("/login/")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Login with either username or email.
     Returns a JWT token and basic user info on success.
     """
-    user = db.query(User).filter(
+    admit_attempt(request)
+    user = await find_user(
+        db,
         or_(
             User.email == form_data.username,
             User.username == form_data.username
         )
-    ).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    )
+    if not user:
         raise HTTPException(status_code=401, detail="Incorrect username/email or password")
+    admit_attempt(request, user)
+    if not await run_password_op(password_hasher.verify, form_data.password, user.hashed_password):
+        record_failed_login(user)
+        raise HTTPException(status_code=401, detail="Incorrect username/email or password")
+
+    # BCRYPT_ROUNDS changed since this hash was made: upgrade it while we have the password.
+    # The password version stays the same, so tokens on other devices remain valid.
+    if needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await password_hasher.hash(form_data.password)
+            await db.commit()
+        except PasswordHasherBusy:
+            pass  # try again on a later login
 
-    SECRET_KEY = os.getenv("SECRET_KEY", "your-fallback-secret")
-    ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
-    payload = {
+    token = create_access_token({
         "sub": user.username,
         "user_id": user.id,
         "email": user.email,
         "username": user.username,
-        "exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
-    }
-    token = jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+        "pwd": user.password_version,
+    })
     return {
         "access_token": token,
         "token_type": "bearer",
@@ -328,13 +1256,35 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
 # === JWT-Protected User Info Endpoint ===
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-ALGORITHM = "HS256"
-SECRET_KEY = os.getenv("SECRET_KEY", "your-fallback-secret")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# user_id -> password version of existing users. Entries expire after
+# USER_CACHE_TTL seconds and are dropped on password reset. A token that does
+# not match the cached entry is checked against the database once more, so a
+# process that cached the version before a reset elsewhere still accepts the
+# new token.
+user_cache = LRUCache(max_entries=settings.user_cache_size, ttl=settings.user_cache_ttl)
+
+async def current_password_version(user_id, refresh=False):
+    """
+    Password version of a user (None if the user is gone), from the user
+    cache when possible; `refresh` reloads it from the database.
+    """
+    version = None if refresh else user_cache.get(user_id)
+    if version is None:
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, user_id)
+        if user is None:
+            return None
+        version = user.password_version
+        user_cache.set(user_id, version)
+    return version
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
-    Decode the JWT token, find the user, and return the user object.
-    Used for endpoints that require login.
+    Decode the JWT token and return the authenticated Principal.
+    Used for endpoints that require login. The verified claims are trusted,
+    so the DB is only queried on a user-cache miss or mismatch; tokens
+    issued before the user's last password reset are rejected.
     """
     credentials_exception = HTTPException(
         status_code=401,
@@ -342,19 +1292,27 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        user = db.query(User).filter(User.username == username).first()
-        if user is None:
-            raise credentials_exception
-        return user
+        payload = decode_access_token(token)
     except JWTError:
         raise credentials_exception
+    username = payload.get("sub")
+    user_id = payload.get("user_id")
+    if username is None or user_id is None:
+        raise credentials_exception
+    version = await current_password_version(user_id)
+    if version is None:
+        raise credentials_exception
+    # Tokens issued before password versions were added carry no "pwd" claim.
+    claimed = payload.get("pwd", version)
+    if claimed != version:
+        # Possibly a stale cache entry (reset handled by another process).
+        version = await current_password_version(user_id, refresh=True)
+        if claimed != version:
+            raise credentials_exception
+    return Principal(user_id, username, payload.get("email"))
 
 @app.get("/me/")
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: Principal = Depends(get_current_user)):
     """Get details about the currently logged-in user (JWT required)."""
     return {"id": current_user.id, "username": current_user.username, "email": current_user.email}
 
@@ -364,14 +1322,15 @@ def read_users_me(current_user: User = Depends(get_current_user)):
 async def request_password_reset(
     background_tasks: BackgroundTasks,
     email: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Generates a secure password reset token for the given email and sends it as a reset link via email.
     """
-    user = db.query(User).filter(User.email == email).first()
+    user = await find_user(db, User.email == email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found with this email.")
+    from email_validator import validate_email, EmailNotValidError
     try:
         # Validate email
         validate_email(email)
@@ -379,13 +1338,14 @@ async def request_password_reset(
         raise HTTPException(status_code=400, detail=str(e))
 
     user.generate_reset_token(expires_in=3600)  # 1 hour expiry
-    db.commit()
+    await db.commit()
 
     # Password reset link
-    frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
+    frontend_url = settings.frontend_url
     reset_link = f"{frontend_url}/reset-password?token={user.reset_token}"
 
     # Compose email
+    from fastapi_mail import MessageSchema
     message = MessageSchema(
         subject="Password Reset Request - TalentMatch",
         recipients=[email],
@@ -404,7 +1364,7 @@ TalentMatch Team
 """,
         subtype="plain"
     )
-    fm = FastMail(conf)
+    fm = mail_client()
     # Send email in the background
     background_tasks.add_task(fm.send_message, message)
 
@@ -414,11 +1374,11 @@ TalentMatch Team
 # --- PASSWORD RESET: Step 2b - Verify a password reset token ---
 
 @app.post("/verify-password-reset/")
-def verify_password_reset(token: str = Form(...), db: Session = Depends(get_db)):
+async def verify_password_reset(token: str = Form(...), db: AsyncSession = Depends(get_async_db)):
     """
     Verifies the given reset token. If valid and not expired, returns OK.
     """
-    user = db.query(User).filter(User.reset_token == token).first()
+    user = await find_user(db, User.reset_token == token)
     if not user or not user.verify_reset_token(token):
         raise HTTPException(status_code=400, detail="Invalid or expired reset token.")
     return {"ok": True, "user_id": user.id, "username": user.username, "email": user.email}
@@ -426,21 +1386,25 @@ def verify_password_reset(token: str = Form(...), db: Session = Depends(get_db))
 # --- PASSWORD RESET: Step 3 - Reset the user's password using the token ---
 
 @app.post("/reset-password/")
-def reset_password(
+async def reset_password(
+    request: Request,
     token: str = Form(...),
     new_password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Reset the user's password using a valid reset token.
     """
-    user = db.query(User).filter(User.reset_token == token).first()
+    admit_attempt(request)
+    user = await find_user(db, User.reset_token == token)
     if not user or not user.verify_reset_token(token):
         raise HTTPException(status_code=400, detail="Invalid or expired reset token.")
 
     # Hash and set the new password
-    user.hashed_password = hash_password(new_password)
+    user.hashed_password = await run_password_op(password_hasher.hash, new_password)
+    user.password_version += 1
     user.clear_reset_token()
-    db.commit()
+    await db.commit()
+    user_cache.pop(user.id)
 
     return {"ok": True, "message": "Password has been reset successfully."}
\ No newline at end of file
@@ -0,0 +1,274 @@
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# === Lightweight Tracing and Metrics ===
+#
+# `span(name)` times a block of code. Each span feeds a latency histogram and an
+# error counter in the process-wide `metrics` registry, and is added to the
+# Server-Timing header of the request it ran in. Recording is a perf_counter()
+# pair, a bisect and a dict update under a lock, so spans can sit on hot paths.
+#
+# `/metrics` renders the registry in the Prometheus text format.
+
+PREFIX = "resume_matcher_"
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# Spans of the current request, as [name, seconds] pairs (see ServerTimingMiddleware).
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by (metric name, sorted label items)."""
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self, gauges=None):
+        """
+        Prometheus text exposition of every metric. `gauges` maps a metric
+        group (e.g. "resume_cache") to a dict of current numeric values, such
+        as the caches' own stats, which are exported as gauges.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (h.buckets, list(h.counts), h.sum, h.count)) for key, h in self._histograms.items()
+            )
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {PREFIX}{name} {self._help[name]}")
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{PREFIX}{name}_count{_labels(labels)} {count}")
+        for group, values in (gauges or {}).items():
+            for key, value in _flatten(values):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{group}_{key}"
+                header(name, "gauge")
+                lines.append(f"{PREFIX}{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _flatten(values, prefix=""):
+    """Nested stats dicts as (underscore_joined_key, value) pairs."""
+    for key, value in values.items():
+        key = prefix + "".join(c if c.isalnum() else "_" for c in str(key))
+        if isinstance(value, dict):
+            yield from _flatten(value, key + "_")
+        else:
+            yield key, value
+
+
+metrics = MetricsRegistry()
+metrics.describe("stage_duration_seconds", "Time spent in each instrumented stage.")
+metrics.describe("stage_errors_total", "Instrumented stages that raised an exception.")
+metrics.describe("llm_tokens_total", "Prompt and completion tokens per LLM stage.")
+metrics.describe("http_request_duration_seconds", "HTTP request latency per route.")
+
+# === Spans ===
+
+
+@contextmanager
+def span(name, **labels):
+    """Time a block as stage `name`; exceptions are counted and re-raised."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        metrics.inc("stage_errors_total", stage=name, **labels)
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        metrics.observe("stage_duration_seconds", seconds, stage=name, **labels)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((name, seconds))
+
+
+def traced(name):
+    """Decorator form of `span` for sync and async functions."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_tokens(stage, prompt_tokens, completion_tokens):
+    metrics.inc("llm_tokens_total", prompt_tokens, stage=stage, kind="prompt")
+    metrics.inc("llm_tokens_total", completion_tokens, stage=stage, kind="completion")
+
+# === Database Queries ===
+
+
+def instrument_engine(engine):
+    """Time every SQL statement on `engine` as a "db.<operation>" span."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _finish_query(conn, statement, failed=False)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None:
+            _finish_query(context.connection, context.statement or "", failed=True)
+
+
+def _finish_query(conn, statement, failed):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    name = "db." + (statement.split(None, 1)[0].lower() if statement.strip() else "query")
+    if failed:
+        metrics.inc("stage_errors_total", stage=name)
+    metrics.observe("stage_duration_seconds", seconds, stage=name)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+# === Server-Timing Middleware ===
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that collects the spans of each HTTP request, records the
+    request latency per route, and reports the spans (summed per name) plus the
+    total in a `Server-Timing` response header. Streaming responses send their
+    headers first, so they only report the spans finished before streaming began.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        spans = []
+        token = _request_spans.set(spans)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(spans, time.perf_counter() - started)))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_spans.reset(token)
+            route = scope.get("route")
+            metrics.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
+
+
+def server_timing_header(spans, total_seconds):
+    totals = {}
+    for name, seconds in spans:
+        count, duration = totals.get(name, (0, 0.0))
+        totals[name] = (count + 1, duration + seconds)
+    parts = [
+        f'{name};dur={duration * 1000:.1f}' + (f';desc="{count}x"' if count > 1 else "")
+        for name, (count, duration) in totals.items()
+    ]
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts).encode("latin-1")
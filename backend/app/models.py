@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Text
 from app.database import Base
 from datetime import datetime, timedelta
 import secrets
+import json
 
 class User(Base):
     __tablename__ = "users"
@@ -10,6 +11,9 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
+    # Bumped on every password reset; tokens carry it, so older ones stop working.
+    # Rehashing the same password (see needs_rehash) keeps it.
+    password_version = Column(Integer, nullable=False, default=1, server_default="1")
     full_name = Column(String, nullable=True)
     reset_token = Column(String, unique=True, nullable=True, index=True)
     reset_token_expiration = Column(DateTime, nullable=True)
@@ -27,4 +31,59 @@ class User(Base):
 
     def clear_reset_token(self):
         self.reset_token = None
-        self.reset_token_expiration = None
\ No newline at end of file
+        self.reset_token_expiration = None
+
+
+class JobPosting(Base):
+    """A job description ingested once, with its extracted requirements stored as JSON."""
+    __tablename__ = "job_postings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String, nullable=True)
+    description = Column(Text, nullable=False)
+    requirements = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def requirement_list(self):
+        return json.loads(self.requirements)
+
+class RequirementCacheEntry(Base):
+    """Persistent tier of the requirement-extraction cache (see app/cache.py)."""
+    __tablename__ = "requirement_cache"
+
+    key = Column(String, primary_key=True)
+    model = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)
+    requirements = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AnalysisJob(Base):
+    """A resume analysis submitted to the background queue (see app/jobs.py)."""
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String, primary_key=True)
+    dedupe_key = Column(String, index=True, nullable=False)
+    status = Column(String, index=True, nullable=False, default="queued")  # queued, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    payload = Column(Text, nullable=False)   # analysis inputs as JSON
+    result = Column(Text, nullable=True)     # response payload as JSON
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # The process running the job, and when its claim lapses unless renewed (see AnalysisQueue).
+    owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True, index=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "result": json.loads(self.result) if self.result else None,
+            "error": self.error,
+        }
@@ -0,0 +1,83 @@
+import asyncio
+import inspect
+
+# === Dependency-Graph Stage Scheduler ===
+#
+# A tiny DAG runner for the analysis pipeline. Every stage is started as soon
+# as the stages it depends on have finished, so independent branches (e.g. the
+# Q&A call and the extract -> match chain) overlap instead of running serially.
+
+
+class Pipeline:
+    """
+    A set of named stages wired together by their dependencies.
+
+    Stages must be added after the stages (or inputs) they depend on,
+    which keeps the graph acyclic by construction.
+    """
+
+    def __init__(self, inputs=()):
+        self.inputs = tuple(inputs)
+        self._stages = {}
+
+    def add(self, name, func, deps=()):
+        """
+        Register a stage. `func` receives the results of `deps` as positional
+        arguments and may be a plain function or a coroutine function.
+        """
+        if name in self._stages or name in self.inputs:
+            raise ValueError(f"Duplicate pipeline stage: {name}")
+        if name == "on_complete":
+            raise ValueError("'on_complete' is reserved")
+        for dep in deps:
+            if dep not in self._stages and dep not in self.inputs:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = (func, tuple(deps))
+        return self
+
+    async def run(self, on_complete=None, **inputs):
+        """
+        Run every stage and return a dict of all inputs and stage results.
+        A stage whose name is passed in `inputs` is treated as already done
+        and is skipped (e.g. requirements loaded from a stored job posting).
+        `on_complete(name, result)` is called as each stage finishes.
+        """
+        unknown = [name for name in inputs if name not in self.inputs and name not in self._stages]
+        if unknown:
+            raise ValueError(f"Unknown pipeline inputs: {', '.join(unknown)}")
+        missing = [name for name in self.inputs if name not in inputs]
+        if missing:
+            raise ValueError(f"Missing pipeline inputs: {', '.join(missing)}")
+
+        futures = {}
+        for name, value in inputs.items():
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            futures[name] = future
+
+        async def run_stage(name, func, deps):
+            args = [await futures[dep] for dep in deps]
+            result = func(*args)
+            if inspect.isawaitable(result):
+                result = await result
+            if on_complete is not None:
+                on_complete(name, result)
+            return result
+
+        # Dict order is insertion order, which is already a topological order.
+        tasks = []
+        for name, (func, deps) in self._stages.items():
+            if name not in futures:
+                futures[name] = asyncio.ensure_future(run_stage(name, func, deps))
+                tasks.append(futures[name])
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # One stage failed: don't leave sibling LLM calls running in the background.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,197 @@
+import json
+import logging
+import re
+import threading
+from collections import Counter
+
+from app.scoring import term_counts
+
+# === Token-Budgeted Prompt Assembly ===
+#
+# Helpers used by the LLM calls in main.py to keep every prompt inside a token
+# budget: count tokens locally, compact JSON, strip resume boilerplate and,
+# when a resume is still too long, keep the sections most relevant to the
+# extracted requirements.
+
+logger = logging.getLogger(__name__)
+
+# The tiktoken encoding is loaded on first use (or by warm_up()): the first load
+# may download the BPE file, which must not delay startup. Without tiktoken, or
+# if loading fails, token counts are estimated and a warning is logged once.
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+# Roughly how BPE tokenizers split English: short word pieces and single symbols.
+_TOKEN_ESTIMATE_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    logger.warning("tiktoken unavailable (%s); token counts are estimated", e)
+                _encoding_loaded = True
+    return _encoding
+
+
+def warm_up():
+    """Load the tokenizer ahead of the first prompt."""
+    _get_encoding()
+
+
+def count_tokens(text):
+    """Number of tokens in `text` (exact with tiktoken installed, estimated otherwise)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_TOKEN_ESTIMATE_RE.findall(text))
+
+
+def compact_json(value):
+    """JSON without indentation or padding: same content, far fewer tokens."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+_BOILERPLATE_RE = re.compile(
+    r"^\s*("
+    r"page \d+( of \d+)?|\d+\s*/\s*\d+|-\s*\d+\s*-"
+    r"|references (are )?available (up)?on request\.?"
+    r"|curriculum vitae|resume|r[ée]sum[ée]"
+    r")\s*$",
+    re.IGNORECASE,
+)
+_SPACES_RE = re.compile(r"[ \t\u00a0]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+PAGE_BREAK = "\f"   # separates PDF pages in extracted text (see app/extraction.py)
+_EDGE_LINES = 2     # lines at the top and bottom of a page that can be a header/footer
+
+
+def _page_edges(lines):
+    """Positions of the first and last few non-empty lines of a page."""
+    filled = [i for i, line in enumerate(lines) if line]
+    return set(filled[:_EDGE_LINES] + filled[-_EDGE_LINES:])
+
+
+def clean_text(text):
+    """
+    Collapse repeated whitespace and drop boilerplate lines: page numbers,
+    "references available on request", and headers/footers, i.e. short lines
+    at the top or bottom of at least half the pages (and 3) of a PDF.
+    """
+    pages = [[_SPACES_RE.sub(" ", line).strip() for line in page.splitlines()] for page in text.split(PAGE_BREAK)]
+    edges = [_page_edges(lines) for lines in pages]
+    repeats = Counter()
+    for lines, positions in zip(pages, edges):
+        repeats.update({lines[i] for i in positions if len(lines[i]) < 80})
+    running = {line for line, count in repeats.items() if count >= max(3, len(pages) / 2)}
+    kept = []
+    for lines, positions in zip(pages, edges):
+        for i, line in enumerate(lines):
+            if _BOILERPLATE_RE.match(line) or (i in positions and line in running):
+                continue
+            kept.append(line)
+        kept.append("")
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(kept)).strip()
+
+
+def split_sections(text, max_tokens=300):
+    """Split text into paragraph-sized sections of at most about `max_tokens` tokens."""
+    sections = []
+    for block in _BLANK_LINES_RE.split(text):
+        block = block.strip()
+        if not block:
+            continue
+        if count_tokens(block) <= max_tokens:
+            sections.append(block)
+            continue
+        # One huge block (e.g. a PDF page with no blank lines): split it by lines.
+        current = []
+        current_tokens = 0
+        for line in block.split("\n"):
+            line_tokens = count_tokens(line)
+            if current and current_tokens + line_tokens > max_tokens:
+                sections.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(line)
+            current_tokens += line_tokens
+        if current:
+            sections.append("\n".join(current))
+    return sections
+
+
+def truncate_to_tokens(text, budget):
+    """Cut `text` down to roughly `budget` tokens."""
+    tokens = count_tokens(text)
+    if tokens <= budget:
+        return text
+    return text[:max(int(len(text) * budget / tokens), 0)]
+
+
+def fit_text(text, budget, focus=None):
+    """
+    Return `text` trimmed to `budget` tokens. Text that fits is returned as
+    is; otherwise it is cleaned and, if still too long, cut down to the
+    opening section (name, summary) plus the sections that share the most
+    terms with `focus` (e.g. the requirement list), in original order.
+    """
+    if count_tokens(text) <= budget:
+        return text.replace(PAGE_BREAK, "\n\n")
+    text = clean_text(text)
+    if count_tokens(text) <= budget:
+        return text
+    sections = split_sections(text)
+    focus_terms = set(term_counts(focus or ""))
+    costs = [count_tokens(section) + 1 for section in sections]
+    relevance = [
+        len(focus_terms.intersection(term_counts(section))) / (cost ** 0.5)
+        for section, cost in zip(sections, costs)
+    ]
+    order = [0] + sorted(range(1, len(sections)), key=lambda i: relevance[i], reverse=True)
+
+    chosen = set()
+    used = 0
+    for i in order:
+        if used + costs[i] <= budget:
+            chosen.add(i)
+            used += costs[i]
+    if not chosen:
+        return truncate_to_tokens(sections[0], budget)
+    return "\n\n".join(sections[i] for i in sorted(chosen))
+
+# === Token Usage Accounting ===
+
+
+class TokenUsage:
+    """Per-stage counts of prompt and completion tokens, as reported by the API."""
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, usage, estimated_prompt_tokens=None):
+        """Record one call. `usage` is the `usage` object of an OpenAI response (may be None)."""
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or estimated_prompt_tokens or 0
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+        with self._lock:
+            stats = self._stages.setdefault(stage, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            stats["calls"] += 1
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["last_call"] = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "estimated_prompt_tokens": estimated_prompt_tokens,
+            }
+        return prompt_tokens, completion_tokens
+
+    def stats(self):
+        with self._lock:
+            return {stage: dict(stats) for stage, stats in self._stages.items()}
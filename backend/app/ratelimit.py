@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+
+from app.llm import LLMProvider, LLMRateLimitError
+from app.metrics import metrics
+from app.prompts import count_tokens
+
+# === Client-Side Rate Limiting for Model Calls ===
+#
+# OpenAI limits each model by requests per minute (RPM) and tokens per minute
+# (TPM). Rather than firing every call and finding out through 429s, the
+# RateLimitedProvider reserves capacity in two token buckets before each call
+# and waits (briefly) when either is empty. The buckets start from LLM_RPM /
+# LLM_TPM and then follow the x-ratelimit-* headers of every response, so they
+# track the account's real limits and remaining quota. A 429 pauses the model's
+# bucket for the Retry-After time.
+#
+# Identical concurrent completions (same stage, model, messages and params),
+# e.g. two uploads against the same job at the same moment, are coalesced:
+# only the first reaches the provider and every caller gets its response.
+
+
+class TokenBucket:
+    """`capacity` units, refilled continuously at `rate` units per second."""
+
+    __slots__ = ("capacity", "rate", "level", "updated")
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` units are available (the level may be negative)."""
+        self.refill(now)
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def resize(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = min(self.level, capacity)
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value):
+    """Seconds in an OpenAI reset header ("1s", "6m0s", "20ms") or Retry-After ("2"); None if unparsable."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class RateLimiter:
+    """
+    RPM and TPM buckets for one model. Callers reserve capacity up front (the
+    bucket level may go negative), so concurrent callers are served in order
+    without holding a lock while they wait.
+    """
+
+    def __init__(self, rpm, tpm, max_wait=30.0):
+        self.requests = TokenBucket(rpm, rpm / 60.0)
+        self.tokens = TokenBucket(tpm, tpm / 60.0)
+        self.max_wait = max_wait
+        self.paused_until = 0.0
+        self.waits = 0
+        self.rejected = 0
+
+    async def acquire(self, tokens):
+        """
+        Reserve one request and `tokens` tokens, sleeping until they are
+        available. Raises LLMRateLimitError at once if that would take longer
+        than `max_wait`, instead of holding the caller's request open.
+        """
+        now = time.monotonic()
+        delay = max(
+            self.paused_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+        )
+        if delay > self.max_wait:
+            self.rejected += 1
+            raise LLMRateLimitError(f"Rate limit: no capacity for {delay:.0f}s", retry_after=delay)
+        self.requests.level -= 1
+        self.tokens.level -= tokens
+        if delay > 0:
+            self.waits += 1
+            metrics.observe("llm_rate_limit_wait_seconds", delay)
+            await asyncio.sleep(delay)
+
+    def settle(self, reserved, used):
+        """Return the tokens reserved but not used (the reservation is an upper bound)."""
+        if used is not None and used < reserved:
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + reserved - used)
+
+    def pause(self, seconds):
+        """Stop issuing calls for `seconds` (after a 429)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def update(self, headers):
+        """Adopt the limits and remaining quota reported in x-ratelimit-* response headers."""
+        now = time.monotonic()
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            try:
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if limit:
+                    limit = float(limit)
+                    if limit > 0 and limit != bucket.capacity:
+                        bucket.resize(limit, limit / 60.0)
+                if remaining is not None:
+                    bucket.refill(now)
+                    bucket.level = min(bucket.level, float(remaining))
+            except ValueError:
+                continue
+
+    def stats(self):
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return {
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "requests_available": round(self.requests.level, 2),
+            "tokens_available": round(self.tokens.level),
+            "paused_seconds": round(max(0.0, self.paused_until - now), 3),
+            "waits": self.waits,
+            "rejected": self.rejected,
+        }
+
+
+class SingleFlight:
+    """Run one call per key at a time; concurrent callers with the same key share its result."""
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key, func):
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(func())
+        self._calls[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        # Shielded: one caller disconnecting must not cancel the call for the others.
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            future.exception()  # retrieved, even if every caller went away
+
+
+class RateLimitedProvider(LLMProvider):
+    """Wraps a provider with per-model RateLimiters and a SingleFlight for completions."""
+
+    def __init__(self, provider, rpm, tpm, max_wait=30.0, coalesce=True):
+        self.provider = provider
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait = max_wait
+        self.limiters = {}
+        self.flights = SingleFlight() if coalesce else None
+        provider.rate_limit_listener = self._on_headers
+
+    def limiter(self, model):
+        limiter = self.limiters.get(model)
+        if limiter is None:
+            limiter = self.limiters[model] = RateLimiter(self.rpm, self.tpm, self.max_wait)
+        return limiter
+
+    def warm_up(self):
+        self.provider.warm_up()
+
+    def _on_headers(self, model, headers):
+        self.limiter(model).update(headers)
+
+    async def complete(self, stage, model, messages, **params):
+        if self.flights is None:
+            return await self._complete(stage, model, messages, params)
+        key = hashlib.sha256(json.dumps([stage, model, messages, params], sort_keys=True).encode("utf-8")).digest()
+        return await self.flights.do(key, lambda: self._complete(stage, model, messages, params))
+
+    async def _complete(self, stage, model, messages, params):
+        limiter = self.limiter(model)
+        reserved = estimate_tokens(messages, params)
+        await limiter.acquire(reserved)
+        try:
+            response = await self.provider.complete(stage, model, messages, **params)
+        except LLMRateLimitError as e:
+            limiter.pause(e.retry_after or 1.0)
+            raise
+        limiter.settle(reserved, total_tokens(response.usage))
+        return response
+
+    async def stream(self, stage, model, messages, **params):
+        limiter = self.limiter(model)
+        reserved = estimate_tokens(messages, params)
+        await limiter.acquire(reserved)
+        try:
+            async for chunk in self.provider.stream(stage, model, messages, **params):
+                if chunk.usage is not None:
+                    limiter.settle(reserved, total_tokens(chunk.usage))
+                yield chunk
+        except LLMRateLimitError as e:
+            limiter.pause(e.retry_after or 1.0)
+            raise
+
+    def stats(self):
+        return {
+            "coalesced": self.flights.coalesced if self.flights else 0,
+            "models": {model: limiter.stats() for model, limiter in self.limiters.items()},
+        }
+
+
+def estimate_tokens(messages, params):
+    """Upper bound of the tokens a call counts against TPM: prompt plus max_tokens."""
+    return sum(count_tokens(message["content"]) for message in messages) + params.get("max_tokens", 1000)
+
+
+def total_tokens(usage):
+    if usage is None:
+        return None
+    return usage.prompt_tokens + usage.completion_tokens
+
+
+metrics.describe("llm_rate_limit_wait_seconds", "Time model calls waited for client-side rate limit capacity.")
@@ -0,0 +1,138 @@
+import hashlib
+import re
+
+# === Match Result Assembly ===
+#
+# Joins the extracted requirements with the model's verdicts in one pass:
+# requirements are indexed by title once, and each verdict claims the first
+# unclaimed requirement with its title. Duplicate titles stay separate
+# results (with their own ID) instead of overwriting each other.
+
+_MULTISPACE_RE = re.compile(r"\s{2,}")
+_BARE_NEWLINE_RE = re.compile(r"(?<![.?!])\n")
+
+
+def clean_explanation(text):
+    """Make AI explanations more readable for users."""
+    text = text.strip()
+    if text and not text[0].isupper():
+        text = text[0].upper() + text[1:]
+    if text and text[-1] not in ".!?":
+        text += "."
+    text = _MULTISPACE_RE.sub(" ", text)
+    if "\n" in text:
+        text = _BARE_NEWLINE_RE.sub(". ", text)
+    return text
+
+
+def join_explanations(original, verdict):
+    """Requirement context followed by the verdict explanation, as one sentence run."""
+    if not verdict:
+        return original
+    if original and not original.endswith("."):
+        original += "."
+    return f"{original} {verdict}" if original else verdict
+
+
+def is_met(verdict):
+    met = verdict.get("met")
+    return met is True or str(met).lower() == "true"
+
+
+def requirement_id(title, occurrence=1):
+    """Stable ID for a requirement: a hash of its title, plus a counter for repeats."""
+    digest = hashlib.sha1(" ".join(title.lower().split()).encode("utf-8")).hexdigest()[:10]
+    return digest if occurrence == 1 else f"{digest}-{occurrence}"
+
+
+class RequirementResult:
+    """One requirement with its verdict."""
+
+    __slots__ = ("id", "requirement", "label", "met", "explanation")
+
+    def __init__(self, id, requirement, label, met, explanation):
+        self.id = id
+        self.requirement = requirement
+        self.label = label          # title, made unique for repeated titles
+        self.met = met
+        self.explanation = explanation
+
+    def to_dict(self):
+        return {"id": self.id, "requirement": self.requirement, "met": self.met, "explanation": self.explanation}
+
+
+class MatchSummary:
+    """All requirement results of one resume, in verdict order."""
+
+    __slots__ = ("results",)
+
+    def __init__(self, results):
+        self.results = results
+
+    @property
+    def met_count(self):
+        return sum(1 for result in self.results if result.met)
+
+    @property
+    def match_ratio(self):
+        return self.met_count / len(self.results) if self.results else 0.0
+
+    def response_fields(self):
+        """
+        The met/missing/explanations fields of the API responses. A repeated
+        title is labelled "Title (2)", so no explanation is lost; `requirements`
+        carries the same results with their stable IDs.
+        """
+        return {
+            "met_requirements": [result.label for result in self.results if result.met],
+            "missing_requirements": [result.label for result in self.results if not result.met],
+            "requirement_explanations": {result.label: result.explanation for result in self.results},
+            "requirements": [result.to_dict() for result in self.results],
+        }
+
+
+def pair_verdicts(requirements, verdicts):
+    """
+    The verdict for each requirement (None if the model returned none): the
+    first unclaimed verdict with its title, so duplicate titles each keep
+    their own. Returns (verdicts in requirement order, verdicts left over).
+    """
+    unclaimed = {}
+    for verdict in verdicts:
+        if isinstance(verdict, dict):
+            unclaimed.setdefault(verdict.get("requirement"), []).append(verdict)
+    for queue in unclaimed.values():
+        queue.reverse()  # pop() from the end claims them in original order
+
+    paired = []
+    for requirement in requirements:
+        queue = unclaimed.get(requirement["requirement"])
+        paired.append(queue.pop() if queue else None)
+    claimed = {id(verdict) for verdict in paired if verdict is not None}
+    leftover = [v for v in verdicts if isinstance(v, dict) and id(v) not in claimed]
+    return paired, leftover
+
+
+def assemble_matches(requirements, match_results):
+    """Combine the extracted requirements with the AI verdicts into a MatchSummary."""
+    unclaimed = {}
+    for requirement in requirements:
+        unclaimed.setdefault(requirement["requirement"], []).append(requirement)
+    for queue in unclaimed.values():
+        queue.reverse()  # pop() from the end claims them in original order
+
+    occurrences = {}
+    results = []
+    for verdict in match_results:
+        title = verdict["requirement"]
+        queue = unclaimed.get(title)
+        original = (queue.pop().get("explanation") or "") if queue else ""
+        occurrence = occurrences[title] = occurrences.get(title, 0) + 1
+        results.append(RequirementResult(
+            id=requirement_id(title, occurrence),
+            requirement=title,
+            label=title if occurrence == 1 else f"{title} ({occurrence})",
+            met=is_met(verdict),
+            explanation=clean_explanation(join_explanations(original, verdict.get("explanation", ""))),
+        ))
+    return MatchSummary(results)
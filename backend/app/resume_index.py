@@ -0,0 +1,232 @@
+import json
+import math
+import os
+import threading
+import time
+from array import array
+
+import numpy as np
+
+# === Resume Store with an Inverted Index ===
+#
+# Maps every normalized term (see app.scoring.term_counts) to a posting list of
+# resume IDs and term frequencies. IDs are assigned in insertion order, so each
+# posting list is always sorted and new resumes are a cheap append.
+#
+# On disk the index is a compact snapshot (delta + varint encoded postings) plus
+# an append-only log of resumes added since the last snapshot. Loading replays
+# the log; compact() folds it into a new snapshot.
+
+SNAPSHOT_MAGIC = b"RIX1"
+
+
+def encode_varint(value, out):
+    """Append `value` to bytearray `out` as an unsigned LEB128 varint."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, pos):
+    """Read one varint from `data` at `pos`; returns (value, next position)."""
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+class ResumeIndex:
+    """Persistent inverted index over stored resumes, scored with BM25."""
+
+    def __init__(self, directory=None, k1=1.2, b=0.75, compact_every=500):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self.compact_every = compact_every
+        self.docs = []                 # resume ID -> metadata dict
+        self.doc_lengths = array("I")  # resume ID -> number of terms
+        self.postings = {}             # term -> (array of IDs, array of term frequencies)
+        self.by_digest = {}            # upload hash -> resume ID
+        self.pending = 0               # resumes in the log but not in the snapshot
+        self._lock = threading.Lock()
+
+    # --- Updates ---
+
+    def add(self, terms, filename=None, digest=None):
+        """
+        Index a resume given its term counts. Returns its resume ID.
+        A file already stored (same upload hash) keeps its existing ID.
+        """
+        with self._lock:
+            if digest is not None and digest in self.by_digest:
+                return self.by_digest[digest]
+            meta = {"filename": filename, "digest": digest, "added_at": time.time()}
+            resume_id = self._add(terms, meta)
+            if self.directory:
+                with open(self._log_path(), "a", encoding="utf-8") as log:
+                    log.write(json.dumps({"meta": meta, "terms": terms}) + "\n")
+                self.pending += 1
+        if self.directory and self.pending >= self.compact_every:
+            self.compact()
+        return resume_id
+
+    def _add(self, terms, meta):
+        resume_id = len(self.docs)
+        self.docs.append(meta)
+        self.doc_lengths.append(sum(terms.values()))
+        for term, count in terms.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = (array("I"), array("I"))
+            posting[0].append(resume_id)
+            posting[1].append(count)
+        if meta.get("digest"):
+            self.by_digest[meta["digest"]] = resume_id
+        return resume_id
+
+    # --- Queries ---
+
+    def search(self, query_terms, k=10):
+        """
+        Top-`k` resumes for a query (term counts of a job description),
+        as a list of (resume ID, BM25 score), best first.
+        Only the posting lists of the query terms are touched.
+        """
+        with self._lock:
+            total = len(self.docs)
+            if not total:
+                return []
+            lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32).astype(np.float64)
+            length_norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1.0))
+            scores = np.zeros(total)
+            for term, query_count in query_terms.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    continue
+                ids = np.frombuffer(posting[0], dtype=np.uint32)
+                tfs = np.frombuffer(posting[1], dtype=np.uint32).astype(np.float64)
+                idf = math.log(1 + (total - len(ids) + 0.5) / (len(ids) + 0.5))
+                weight = idf * (1 + math.log(query_count))
+                scores[ids] += weight * tfs * (self.k1 + 1) / (tfs + length_norm[ids])
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(resume_id), float(scores[resume_id])) for resume_id in ranked]
+
+    def document_frequencies(self, terms):
+        """(number of resumes, how many resumes contain each term): IDF statistics for LocalScorer."""
+        with self._lock:
+            postings = self.postings
+            return len(self.docs), [len(postings[term][0]) if term in postings else 0 for term in terms]
+
+    def describe(self, resume_id):
+        meta = self.docs[resume_id]
+        return {"id": resume_id, "filename": meta["filename"], "added_at": meta["added_at"]}
+
+    def stats(self):
+        return {
+            "resumes": len(self.docs),
+            "terms": len(self.postings),
+            "postings": sum(len(ids) for ids, _ in self.postings.values()),
+            "pending_log_entries": self.pending,
+        }
+
+    # --- Persistence ---
+
+    def _snapshot_path(self):
+        return os.path.join(self.directory, "index.bin")
+
+    def _log_path(self):
+        return os.path.join(self.directory, "additions.log")
+
+    def load(self):
+        """Load the snapshot and replay the additions log (call once at startup)."""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self.docs = []
+            self.doc_lengths = array("I")
+            self.postings = {}
+            self.by_digest = {}
+            self.pending = 0
+            if os.path.exists(self._snapshot_path()):
+                with open(self._snapshot_path(), "rb") as f:
+                    self._read_snapshot(f.read())
+            if os.path.exists(self._log_path()):
+                with open(self._log_path(), encoding="utf-8") as log:
+                    for line in log:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            break  # torn write at the end of the log
+                        self._add(entry["terms"], entry["meta"])
+                        self.pending += 1
+
+    def compact(self):
+        """Write a new snapshot containing every resume and truncate the log."""
+        if not self.directory:
+            return
+        with self._lock:
+            data = self._write_snapshot()
+            temp_path = self._snapshot_path() + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self._snapshot_path())
+            open(self._log_path(), "w").close()
+            self.pending = 0
+
+    def _write_snapshot(self):
+        out = bytearray(SNAPSHOT_MAGIC)
+        header = json.dumps({"docs": self.docs, "doc_lengths": self.doc_lengths.tolist()}).encode("utf-8")
+        encode_varint(len(header), out)
+        out += header
+        encode_varint(len(self.postings), out)
+        for term, (ids, tfs) in self.postings.items():
+            term_bytes = term.encode("utf-8")
+            encode_varint(len(term_bytes), out)
+            out += term_bytes
+            encode_varint(len(ids), out)
+            previous = 0
+            for resume_id in ids:
+                encode_varint(resume_id - previous, out)
+                previous = resume_id
+            for count in tfs:
+                encode_varint(count, out)
+        return bytes(out)
+
+    def _read_snapshot(self, data):
+        if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError("Not a resume index snapshot")
+        pos = len(SNAPSHOT_MAGIC)
+        size, pos = decode_varint(data, pos)
+        header = json.loads(data[pos:pos + size].decode("utf-8"))
+        pos += size
+        self.docs = header["docs"]
+        self.doc_lengths = array("I", header["doc_lengths"])
+        self.by_digest = {meta["digest"]: i for i, meta in enumerate(self.docs) if meta.get("digest")}
+        term_total, pos = decode_varint(data, pos)
+        for _ in range(term_total):
+            size, pos = decode_varint(data, pos)
+            term = data[pos:pos + size].decode("utf-8")
+            pos += size
+            length, pos = decode_varint(data, pos)
+            ids = array("I")
+            previous = 0
+            for _ in range(length):
+                delta, pos = decode_varint(data, pos)
+                previous += delta
+                ids.append(previous)
+            tfs = array("I")
+            for _ in range(length):
+                count, pos = decode_varint(data, pos)
+                tfs.append(count)
+            self.postings[term] = (ids, tfs)
@@ -0,0 +1,130 @@
+import math
+import re
+from collections import Counter
+from itertools import compress, repeat
+
+import numpy as np
+
+# === Local TF-IDF Scoring Engine ===
+#
+# Scores resumes against job descriptions with sparse TF-IDF vectors and cosine
+# similarity. Job vectors are built once; scoring N resumes against M jobs is a
+# single sparse matrix product, so thousands of resumes rank in milliseconds
+# without any network or GPU. Used as the pre-screen before the LLM match step.
+
+TOKEN_RE = re.compile(r'\w+')
+
+STOP_WORDS = frozenset("""
+a about an and are as at be been but by can for from has have if in into is it its
+of on or our such that the their there these they this to was we were will with
+you your who what which when where how all any may must should would also other
+""".split())
+
+
+def term_counts(text):
+    """Lower-cased term frequencies for a text, without stop words and 1-char tokens."""
+    return Counter(
+        term for term in TOKEN_RE.findall(text.lower())
+        if len(term) > 1 and term not in STOP_WORDS
+    )
+
+
+class LocalScorer:
+    """
+    TF-IDF model fitted on a set of job descriptions.
+
+    Document frequencies come from the jobs plus an optional extra corpus
+    (e.g. the resumes of a batch), which gives meaningful IDF weights even
+    for a single job. Inputs are term-count mappings from `term_counts`.
+
+    `corpus` adds a collection known only by its document frequencies, such
+    as the resume index: any object with `document_frequencies(terms)`
+    returning (number of documents, frequency of each term).
+    """
+
+    def __init__(self, job_terms, corpus_terms=(), corpus=None):
+        job_terms = list(job_terms)
+        document_frequency = Counter()
+        for counts in job_terms:
+            document_frequency.update(counts.keys())
+        for counts in corpus_terms:
+            document_frequency.update(counts.keys())
+        documents = len(job_terms) + len(corpus_terms)
+        self.corpus = corpus
+        if corpus is not None:
+            vocabulary = list(document_frequency)
+            corpus_documents, frequencies = corpus.document_frequencies(vocabulary)
+            document_frequency.update(dict(zip(vocabulary, frequencies)))
+            documents += corpus_documents
+        self.documents = documents
+
+        self.vocabulary = {term: index for index, term in enumerate(document_frequency)}
+        df = np.fromiter(document_frequency.values(), dtype=np.float64, count=len(document_frequency))
+        self.idf = np.log((1 + documents) / (1 + df)) + 1
+        # Terms never seen while fitting still count towards a document's norm.
+        self.unseen_idf = math.log(1 + documents) + 1
+        self.job_matrix = self.vectorize(job_terms)
+
+    @classmethod
+    def from_texts(cls, job_texts, corpus_texts=()):
+        return cls([term_counts(text) for text in job_texts], [term_counts(text) for text in corpus_texts])
+
+    def vectorize(self, documents):
+        """Build an L2-normalized sparse TF-IDF matrix (one row per document)."""
+        terms = []
+        counts = []
+        lengths = []
+        for document in documents:
+            terms.extend(document.keys())
+            counts.extend(document.values())
+            lengths.append(len(document))
+        rows = len(lengths)
+
+        indices = np.fromiter(
+            map(self.vocabulary.get, terms, repeat(-1, len(terms))), dtype=np.int64, count=len(terms)
+        )
+        row_ids = np.repeat(np.arange(rows), lengths)
+        weights = 1 + np.log(np.asarray(counts, dtype=np.float64))  # sublinear tf
+        seen = indices >= 0
+
+        unseen_idf = self._unseen_idf(list(compress(terms, ~seen)))
+        unseen_norms = np.bincount(
+            row_ids[~seen], weights=(weights[~seen] * unseen_idf) ** 2, minlength=rows
+        )
+        row_ids, indices = row_ids[seen], indices[seen]
+        data = weights[seen] * self.idf[indices]
+        norms = np.sqrt(np.bincount(row_ids, weights=data ** 2, minlength=rows) + unseen_norms)
+        norms[norms == 0] = 1.0
+        data /= norms[row_ids]
+        from scipy import sparse  # slow to import; loaded on first use or by warm_up()
+
+        return sparse.csr_matrix((data, (row_ids, indices)), shape=(rows, len(self.vocabulary)))
+
+    def _unseen_idf(self, terms):
+        """IDF of terms outside the vocabulary: never seen, unless the corpus knows them."""
+        if self.corpus is None:
+            return self.unseen_idf
+        _, frequencies = self.corpus.document_frequencies(terms)
+        # The corpus may have grown since fitting; keep the weights positive.
+        df = np.minimum(np.asarray(frequencies, dtype=np.float64), self.documents)
+        return np.log((1 + self.documents) / (1 + df)) + 1
+
+    def score(self, resume_terms):
+        """Cosine similarity matrix of shape (resumes, jobs), values in [0, 1]."""
+        resume_matrix = self.vectorize(resume_terms)
+        return (resume_matrix @ self.job_matrix.T).toarray()
+
+    def top_k(self, resume_terms, k, job=0):
+        """Indices of the `k` best resumes for one job, best first, and the full score column."""
+        scores = self.score(resume_terms)[:, job]
+        if k is None or k >= len(scores):
+            order = np.argsort(-scores, kind="stable")
+        else:
+            best = np.argpartition(-scores, k)[:k]
+            order = best[np.argsort(-scores[best], kind="stable")]
+        return order.tolist(), scores
+
+
+def warm_up():
+    """Import scipy.sparse ahead of the first score."""
+    from scipy import sparse
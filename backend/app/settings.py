@@ -0,0 +1,52 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()  # Load secrets from .env for devs
+
+# === Application Settings ===
+# Read from the environment once at import time; request handlers use
+# `settings` instead of calling os.getenv on every request.
+
+
+class Settings:
+    """Auth and deployment settings."""
+
+    def __init__(self):
+        # --- JWT ---
+        self.secret_key = os.getenv("SECRET_KEY", "your-fallback-secret")
+        self.jwt_algorithm = os.getenv("JWT_ALGORITHM", "HS256")
+        self.access_token_expire_minutes = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60 * 24))
+
+        # --- Authenticated user cache (see get_current_user) ---
+        self.user_cache_size = int(os.getenv("USER_CACHE_SIZE", 10000))
+        self.user_cache_ttl = int(os.getenv("USER_CACHE_TTL", 300))
+
+        # --- Password hashing (see app.auth.PasswordHasher) ---
+        self.bcrypt_rounds = int(os.getenv("BCRYPT_ROUNDS", 12))
+        self.password_hash_workers = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+        self.password_hash_max_queue = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 64))
+
+        # --- Login/registration admission control, per client IP and per username ---
+        self.auth_attempts_per_minute = int(os.getenv("AUTH_ATTEMPTS_PER_MINUTE", 10))
+        self.auth_attempts_burst = int(os.getenv("AUTH_ATTEMPTS_BURST", 5))
+
+        # --- Outgoing mail (password reset) ---
+        self.mail_username = os.getenv("MAIL_USERNAME")
+        self.mail_password = os.getenv("MAIL_PASSWORD")
+        self.mail_from = os.getenv("MAIL_FROM")
+        self.mail_from_name = os.getenv("MAIL_FROM_NAME", "TalentMatch")
+        self.mail_server = os.getenv("MAIL_SERVER")
+        self.mail_port = int(os.getenv("MAIL_PORT", 587))
+        self.mail_starttls = os.getenv("MAIL_STARTTLS", "True") == "True"
+        self.mail_ssl_tls = os.getenv("MAIL_SSL_TLS", "False") == "True"
+
+        # --- Startup ---
+        # Load slow imports (OpenAI client, scipy, document parsers) in the
+        # background once the app is serving, instead of on the first request.
+        self.warm_up = os.getenv("WARM_UP", "True") == "True"
+
+        # --- Links in emails ---
+        self.frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
+
+
+settings = Settings()
@@ -0,0 +1,282 @@
+import argparse
+import io
+import json
+import os
+import random
+
+from docx import Document
+
+# === Synthetic Benchmark Corpus ===
+#
+# Deterministic resumes, job descriptions and model outputs for the benchmark
+# suite. Everything is generated from a seed, so two runs (or two commits)
+# measure exactly the same inputs. Resumes can be rendered as plain text,
+# PDF or DOCX.
+
+SKILLS = [
+    "Python", "FastAPI", "Django", "Flask", "PostgreSQL", "MySQL", "Redis", "Kafka", "Docker",
+    "Kubernetes", "Terraform", "AWS", "GCP", "Azure", "React", "TypeScript", "Node.js", "GraphQL",
+    "REST APIs", "gRPC", "Spark", "Airflow", "Pandas", "NumPy", "PyTorch", "TensorFlow", "SQL",
+    "Linux", "Bash", "Git", "CI/CD", "Jenkins", "GitHub Actions", "Prometheus", "Grafana",
+    "Elasticsearch", "MongoDB", "RabbitMQ", "Celery", "Go", "Java", "Scala", "Rust", "C++",
+]
+TITLES = [
+    "Software Engineer", "Senior Software Engineer", "Backend Developer", "Data Engineer",
+    "Machine Learning Engineer", "DevOps Engineer", "Site Reliability Engineer", "Full Stack Developer",
+]
+COMPANIES = [
+    "Northwind Systems", "Contoso Analytics", "Globex Corporation", "Initech", "Umbrella Health",
+    "Stark Logistics", "Wayne Financial", "Acme Cloud", "Hooli", "Vandelay Industries",
+]
+DEGREES = [
+    "B.Sc. in Computer Science", "M.Sc. in Computer Science", "B.Eng. in Software Engineering",
+    "M.Sc. in Data Science", "B.Sc. in Mathematics", "Ph.D. in Computer Science",
+]
+CERTIFICATIONS = [
+    "AWS Certified Solutions Architect", "Certified Kubernetes Administrator", "PMP",
+    "Google Professional Data Engineer", "CISSP", "Azure Developer Associate",
+]
+LANGUAGES = ["English", "French", "Spanish", "German", "Vietnamese", "Mandarin"]
+CITIES = ["Toronto", "Montreal", "Vancouver", "Ottawa", "Calgary", "Halifax"]
+VERBS = [
+    "Designed", "Built", "Led", "Migrated", "Optimized", "Maintained", "Automated", "Scaled",
+    "Refactored", "Monitored", "Deployed", "Mentored",
+]
+OBJECTS = [
+    "a payment processing service", "the customer data platform", "an internal search engine",
+    "real-time analytics pipelines", "the authentication service", "a recommendation system",
+    "the CI/CD infrastructure", "a multi-tenant REST API", "batch ETL jobs", "the monitoring stack",
+]
+OUTCOMES = [
+    "reducing latency by {n}%", "cutting infrastructure costs by {n}%", "serving {n}k requests per minute",
+    "improving test coverage to {n}%", "supporting {n} engineering teams", "processing {n}M events per day",
+]
+
+# Roughly how many text lines fit on a resume page.
+LINES_PER_PAGE = 45
+
+
+class Corpus:
+    """Seeded generator for resumes, job descriptions and model responses."""
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.random = random.Random(seed)
+
+    # --- Resumes ---
+
+    def resume_lines(self, pages=1):
+        """Lines of a resume that fills about `pages` pages."""
+        rng = self.random
+        skills = rng.sample(SKILLS, 12)
+        lines = [
+            f"{rng.choice(['Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan'])} {rng.choice(['Nguyen', 'Smith', 'Tremblay', 'Garcia', 'Chen'])}",
+            f"{rng.choice(TITLES)} | {rng.choice(CITIES)}, Canada | candidate@example.com",
+            "",
+            "SUMMARY",
+            f"{rng.choice(TITLES)} with {rng.randint(2, 15)} years of experience in "
+            f"{', '.join(skills[:4])} and {skills[4]}.",
+            "",
+            "EXPERIENCE",
+        ]
+        target = pages * LINES_PER_PAGE - 14
+        year = 2024
+        while len(lines) < target:
+            start = year - rng.randint(1, 4)
+            lines.append(f"{rng.choice(TITLES)}, {rng.choice(COMPANIES)} ({start} - {year})")
+            for _ in range(rng.randint(3, 6)):
+                outcome = rng.choice(OUTCOMES).format(n=rng.randint(5, 90))
+                lines.append(
+                    f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(skills)} "
+                    f"and {rng.choice(skills)}, {outcome}."
+                )
+            lines.append("")
+            year = start
+        lines += [
+            "EDUCATION",
+            f"{rng.choice(DEGREES)}, University of {rng.choice(CITIES)} ({year - 4} - {year})",
+            "",
+            "CERTIFICATIONS",
+            *rng.sample(CERTIFICATIONS, 2),
+            "",
+            "SKILLS",
+            ", ".join(skills),
+            "",
+            "LANGUAGES",
+            ", ".join(rng.sample(LANGUAGES, 2)),
+        ]
+        return lines
+
+    def resume_text(self, pages=1):
+        return "\n".join(self.resume_lines(pages))
+
+    def resume_pdf(self, pages=1):
+        return make_pdf(paginate(self.resume_lines(pages)))
+
+    def resume_docx(self, pages=1):
+        return make_docx(self.resume_lines(pages))
+
+    def resume_file(self, fmt, pages=1):
+        """(filename, bytes) of a resume in "pdf", "docx" or "text" format."""
+        if fmt == "pdf":
+            return "resume.pdf", self.resume_pdf(pages)
+        if fmt == "docx":
+            return "resume.docx", self.resume_docx(pages)
+        return "resume.txt", self.resume_text(pages).encode("utf-8")
+
+    # --- Job descriptions ---
+
+    def job_description(self):
+        rng = self.random
+        skills = rng.sample(SKILLS, 8)
+        title = rng.choice(TITLES)
+        paragraphs = [
+            f"{title} - {rng.choice(COMPANIES)} ({rng.choice(CITIES)}, hybrid)",
+            f"We are looking for a {title.lower()} to join our platform team and help us build "
+            f"{rng.choice(OBJECTS)} and {rng.choice(OBJECTS)}.",
+            "Requirements:\n" + "\n".join([
+                f"- {rng.randint(2, 8)}+ years of professional experience with {skills[0]}",
+                f"- Strong knowledge of {skills[1]}, {skills[2]} and {skills[3]}",
+                f"- Experience with {skills[4]} in production",
+                f"- {rng.choice(DEGREES).split(' in ')[0]} in a related field or equivalent experience",
+                f"- Fluent in {rng.choice(LANGUAGES[:2])}",
+                f"- {rng.choice(CERTIFICATIONS)} is an asset",
+                f"- Eligible to work in Canada; able to commute to {rng.choice(CITIES)} twice a week",
+            ]),
+            "Nice to have:\n" + "\n".join(f"- {skill}" for skill in skills[5:]),
+            "We offer competitive salary, flexible hours, and a learning budget.",
+        ]
+        return "\n\n".join(paragraphs)
+
+    # --- Model outputs ---
+
+    def requirements(self, count=10):
+        rng = self.random
+        return [
+            {
+                "requirement": f"{rng.randint(2, 8)}+ years of {skill}",
+                "explanation": f"The role relies on {skill} for {rng.choice(OBJECTS)}.",
+            }
+            for skill in rng.sample(SKILLS, count)
+        ]
+
+    def match_results(self, requirements):
+        rng = self.random
+        return [
+            {
+                "requirement": r["requirement"],
+                "met": rng.random() < 0.6,
+                "explanation": rng.choice([
+                    "the resume lists several projects using this",
+                    "not mentioned anywhere in the resume",
+                    "only loosely related experience  is shown\nin one role",
+                    "Clearly demonstrated in the most recent position",
+                ]),
+            }
+            for r in requirements
+        ]
+
+    def model_outputs(self, count=10):
+        """
+        Typical chat-model answers for the requirement/match prompts, keyed by
+        shape: bare JSON, markdown-fenced JSON, JSON wrapped in prose, and a
+        truncated (max_tokens) answer.
+        """
+        requirements = self.requirements(count)
+        bare = json.dumps(self.match_results(requirements), indent=2)
+        return {
+            "bare": bare,
+            "fenced": "```json\n" + bare + "\n```",
+            "prose": "Here is the analysis you asked for:\n\n" + bare + "\n\nLet me know if you need anything else.",
+            "truncated": bare[:int(len(bare) * 0.8)],
+        }
+
+    def explanations(self, count=50):
+        return [item["explanation"] for item in self.match_results(self.requirements(min(count, len(SKILLS))))]
+
+# === File Rendering ===
+
+
+def paginate(lines, lines_per_page=LINES_PER_PAGE, width=95):
+    """Wrap long lines and split them into pages."""
+    wrapped = []
+    for line in lines:
+        while len(line) > width:
+            cut = line.rfind(" ", 0, width)
+            cut = cut if cut > 0 else width
+            wrapped.append(line[:cut])
+            line = line[cut:].lstrip()
+        wrapped.append(line)
+    return [wrapped[i:i + lines_per_page] for i in range(0, len(wrapped), lines_per_page)] or [[]]
+
+
+def make_pdf(pages):
+    """Minimal single-font PDF with one text stream per page (no extra dependencies)."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages))), len(pages)
+        )).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for number, lines in enumerate(pages):
+        ops = ["BT /F1 10 Tf 15 TL 50 750 Td"]
+        for line in lines:
+            line = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({line}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        objects.append((
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * number} 0 R >>"
+        ).encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def make_docx(lines):
+    document = Document()
+    for line in lines:
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+# === CLI ===
+
+
+def write_corpus(directory, resumes=20, jobs=5, seed=0):
+    """Write a sample corpus to disk (resumes in every format, jobs as .txt)."""
+    corpus = Corpus(seed)
+    os.makedirs(directory, exist_ok=True)
+    for i in range(resumes):
+        pages = 1 + i % 4
+        for fmt in ("pdf", "docx", "text"):
+            name, data = corpus.resume_file(fmt, pages)
+            stem, ext = os.path.splitext(name)
+            with open(os.path.join(directory, f"{stem}-{i:03d}-{pages}p{ext}"), "wb") as f:
+                f.write(data)
+    for i in range(jobs):
+        with open(os.path.join(directory, f"job-{i:03d}.txt"), "w", encoding="utf-8") as f:
+            f.write(corpus.job_description())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the synthetic benchmark corpus to a directory.")
+    parser.add_argument("directory")
+    parser.add_argument("--resumes", type=int, default=20)
+    parser.add_argument("--jobs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_corpus(args.directory, args.resumes, args.jobs, args.seed)
@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import glob
+import io
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timezone
+
+from benchmarks.corpus import Corpus
+
+# === Benchmark Runner ===
+#
+# Usage (from backend/):
+#   python -m benchmarks.run                  # micro benchmarks + load test
+#   python -m benchmarks.run --suite micro
+#   python -m benchmarks.run --clients 1,16,64 --requests 400
+#   python -m benchmarks.run --url http://localhost:8000   # load-test a running server
+#   python -m benchmarks.run --suite startup  # cold start: import + first request
+#
+# The model is always the local FakeProvider (LLM_PROVIDER=fake), so results
+# measure our own code plus a fixed, simulated model latency. Each run is saved
+# as benchmarks/results/<timestamp>-<commit>.json and compared with the
+# previous run, so regressions between commits show up immediately.
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+EXTRACT_SIZES = (1, 5, 20)  # pages
+SCORE_SIZES = (1, 3, 10)
+
+
+def configure_environment(args):
+    """Settings for app.main; must run before the app is imported."""
+    scratch = tempfile.mkdtemp(prefix="resume-matcher-bench-")
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["FAKE_LLM_JITTER"] = str(args.llm_jitter)
+    os.environ["FAKE_LLM_SEED"] = str(args.seed)
+    os.environ["RESUME_INDEX_DIR"] = os.path.join(scratch, "resume_index")
+    if not args.warm_cache:
+        os.environ["RESUME_CACHE_SIZE"] = "0"
+        os.environ["REQUIREMENT_CACHE_SIZE"] = "0"
+        os.environ["RESULT_CACHE_SIZE"] = "0"
+        os.environ["JOB_SCORER_CACHE_SIZE"] = "0"
+        os.environ["LOCAL_MATCH"] = "False"
+        os.environ.pop("RESUME_CACHE_DIR", None)
+    os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(scratch, "bench.db"))
+    os.environ.setdefault("OPENAI_API_KEY", "unused")
+    os.environ.setdefault("MAIL_USERNAME", "bench")
+    os.environ.setdefault("MAIL_PASSWORD", "bench")
+    os.environ.setdefault("MAIL_FROM", "bench@example.com")
+    os.environ.setdefault("MAIL_SERVER", "localhost")
+
+# === Timing Helpers ===
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+def summarize(seconds, **extra):
+    """Per-call timing stats in milliseconds."""
+    values = sorted(seconds)
+    return dict(
+        extra,
+        runs=len(values),
+        min_ms=values[0] * 1000,
+        median_ms=statistics.median(values) * 1000,
+        mean_ms=statistics.fmean(values) * 1000,
+        p95_ms=percentile(values, 95) * 1000,
+        max_ms=values[-1] * 1000,
+    )
+
+
+def measure(func, repeat=7):
+    """Time a synchronous callable: calibrated like timeit, best of `repeat` batches."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return summarize([t / number for t in timer.repeat(repeat=repeat, number=number)], loops=number)
+
+
+async def measure_async(make_call, runs):
+    """Time `runs` sequential awaits of `make_call()`."""
+    await make_call()  # warm-up
+    seconds = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await make_call()
+        seconds.append(time.perf_counter() - started)
+    return summarize(seconds)
+
+# === Micro Benchmarks ===
+
+
+def upload_file(filename, data):
+    from fastapi import UploadFile
+    return UploadFile(io.BytesIO(data), size=len(data), filename=filename)
+
+
+async def micro_benchmarks(corpus, runs, log):
+    from app import main
+
+    results = {}
+
+    def record(name, stats):
+        results[name] = stats
+        log(f"  {name:<40} median {stats['median_ms']:9.3f} ms   p95 {stats['p95_ms']:9.3f} ms")
+
+    # Full upload path: spool, hash, extraction worker, term counts.
+    await main.extraction_service.warm_up()
+    for fmt in ("pdf", "docx", "text"):
+        for pages in EXTRACT_SIZES:
+            filename, data = corpus.resume_file(fmt, pages)
+            stats = await measure_async(lambda: main.extract_text(upload_file(filename, data)), runs)
+            record(f"extract_text[{fmt}-{pages}p]", dict(stats, bytes=len(data)))
+
+    outputs = corpus.model_outputs()
+    for shape, content in outputs.items():
+        record(f"safe_json_parse[{shape}]", measure(lambda: main.safe_json_parse(content)))
+
+    explanations = corpus.explanations(50)
+    record(
+        "clean_explanation[50 items]",
+        measure(lambda: [main.clean_explanation(text) for text in explanations]),
+    )
+
+    job_text = corpus.job_description()
+    for pages in SCORE_SIZES:
+        resume_text = corpus.resume_text(pages)
+        record(f"ai_match_score[{pages}p]", measure(lambda: main.ai_match_score(resume_text, job_text)))
+
+    return results
+
+# === Endpoint Load Test ===
+
+
+def build_payloads(corpus, count):
+    """Mixed resume uploads (formats and sizes) paired with job descriptions."""
+    jobs = [corpus.job_description() for _ in range(5)]
+    payloads = []
+    for i in range(count):
+        fmt = ("pdf", "docx", "text")[i % 3]
+        filename, data = corpus.resume_file(fmt, 1 + i % 3)
+        payloads.append((filename, data, jobs[i % len(jobs)]))
+    return payloads
+
+
+def is_error_response(response):
+    if response.status_code != 200:
+        return True
+    suggestions = response.json().get("ai_suggestions") or []
+    return bool(suggestions) and suggestions[0].get("question") == "Error"
+
+
+async def load_level(client, payloads, clients, requests, pipeline_mode=None):
+    """Fire `requests` uploads from `clients` concurrent clients; returns latency stats."""
+    latencies = []
+    errors = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal next_request, errors
+        while next_request < requests:
+            filename, data, job_text = payloads[next_request % len(payloads)]
+            next_request += 1
+            started = time.perf_counter()
+            form = {"job_description": job_text}
+            if pipeline_mode:
+                form["pipeline_mode"] = pipeline_mode
+            response = await client.post("/upload-resume/", files={"resume": (filename, data)}, data=form)
+            latencies.append(time.perf_counter() - started)
+            if is_error_response(response):
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(clients)])
+    elapsed = time.perf_counter() - started
+    return dict(
+        summarize(latencies),
+        clients=clients,
+        errors=errors,
+        seconds=elapsed,
+        throughput_rps=len(latencies) / elapsed,
+        p50_ms=percentile(sorted(latencies), 50) * 1000,
+        p90_ms=percentile(sorted(latencies), 90) * 1000,
+        p99_ms=percentile(sorted(latencies), 99) * 1000,
+    )
+
+
+async def load_test(corpus, client_levels, requests, url, log, pipeline_mode=None):
+    import httpx
+
+    payloads = build_payloads(corpus, 30)
+    results = {}
+
+    async def run_levels(client):
+        await load_level(client, payloads, clients=4, requests=8, pipeline_mode=pipeline_mode)  # warm-up
+        for clients in client_levels:
+            stats = await load_level(client, payloads, clients, requests, pipeline_mode)
+            results[f"clients={clients}"] = stats
+            log(
+                f"  clients={clients:<4} {stats['throughput_rps']:8.1f} req/s   p50 {stats['p50_ms']:8.1f} ms"
+                f"   p99 {stats['p99_ms']:8.1f} ms   errors {stats['errors']}"
+            )
+
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=None) as client:
+            await run_levels(client)
+        return results
+
+    from app.main import app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await run_levels(client)
+    return results
+
+# === Cold Start ===
+
+STARTUP_PHASES = ("import", "startup", "first_request", "ready")
+
+
+def startup_benchmark(runs, log):
+    """Run benchmarks/startup.py in `runs` fresh interpreters; per-phase stats."""
+    env = dict(os.environ, FAKE_LLM_LATENCY="0", FAKE_LLM_JITTER="0")
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup"],
+            capture_output=True, text=True, check=True, env=env, cwd=backend,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    results = {}
+    for phase in STARTUP_PHASES:
+        stats = summarize([sample[phase] for sample in samples])
+        results[phase] = stats
+        log(f"  {phase:<16} median {stats['median_ms']:9.1f} ms   max {stats['max_ms']:9.1f} ms")
+    return results
+
+# === Result Files ===
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True
+        ).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def previous_result(directory):
+    paths = sorted(glob.glob(os.path.join(directory, "*.json")))
+    return paths[-1] if paths else None
+
+
+def compare(current, previous, log, threshold=0.10):
+    """Print the change of each median/p99/throughput against a previous run."""
+    log(f"\nCompared with {previous['commit'] or 'unknown commit'} ({previous['timestamp']}):")
+    rows = []
+    for name, stats in current.get("micro", {}).items():
+        old = previous.get("micro", {}).get(name)
+        if old:
+            rows.append((name + " median", old["median_ms"], stats["median_ms"], False))
+    for name, stats in current.get("load", {}).items():
+        old = previous.get("load", {}).get(name)
+        if old:
+            rows.append((name + " p99", old["p99_ms"], stats["p99_ms"], False))
+            rows.append((name + " throughput", old["throughput_rps"], stats["throughput_rps"], True))
+    for name, stats in current.get("startup", {}).items():
+        old = previous.get("startup", {}).get(name)
+        if old:
+            rows.append(("startup " + name + " median", old["median_ms"], stats["median_ms"], False))
+    for label, old, new, higher_is_better in rows:
+        change = (new - old) / old if old else 0.0
+        worse = change < -threshold if higher_is_better else change > threshold
+        log(f"  {label:<48} {old:10.3f} -> {new:10.3f}  {change:+7.1%}{'  REGRESSION' if worse else ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the resume matching pipeline.")
+    parser.add_argument("--suite", choices=("all", "micro", "load", "startup"), default="all")
+    parser.add_argument("--clients", default="1,8,32", help="comma-separated concurrent client counts")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--runs", type=int, default=20, help="timed calls per extract_text benchmark")
+    parser.add_argument("--startup-runs", type=int, default=5, help="fresh processes for the startup suite")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="simulated model latency (seconds)")
+    parser.add_argument("--llm-jitter", type=float, default=0.05)
+    parser.add_argument("--pipeline-mode", choices=("two_stage", "single_pass"),
+                        help="pipeline_mode sent with each upload (default: the server's PIPELINE_MODE)")
+    parser.add_argument("--warm-cache", action="store_true", help="keep the caches and the local matcher (LOCAL_MATCH) on")
+    parser.add_argument("--url", help="load-test a running server instead of the in-process app")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=RESULTS_DIR, help="directory for result files")
+    parser.add_argument("--compare", help="result file to compare with (default: the latest in --output)")
+    args = parser.parse_args(argv)
+
+    configure_environment(args)
+    log = print
+    commit, dirty = git_revision()
+    result = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "llm_latency": args.llm_latency,
+            "llm_jitter": args.llm_jitter,
+            "warm_cache": args.warm_cache,
+            "pipeline_mode": args.pipeline_mode,
+            "seed": args.seed,
+            "url": args.url,
+        },
+    }
+
+    if args.suite in ("all", "micro"):
+        log("Micro benchmarks:")
+        result["micro"] = asyncio.run(micro_benchmarks(Corpus(args.seed), args.runs, log))
+    if args.suite in ("all", "load"):
+        client_levels = [int(n) for n in args.clients.split(",") if n]
+        log(f"Load test: POST /upload-resume/, {args.requests} requests per level:")
+        result["load"] = asyncio.run(load_test(
+            Corpus(args.seed), client_levels, args.requests, args.url, log, args.pipeline_mode
+        ))
+
+    if args.suite in ("all", "startup"):
+        log(f"Cold start, {args.startup_runs} fresh processes:")
+        result["startup"] = startup_benchmark(args.startup_runs, log)
+
+    baseline = args.compare or previous_result(args.output)
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            compare(result, json.load(f), log)
+
+    os.makedirs(args.output, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(args.output, f"{stamp}-{(commit or 'nogit')[:10]}{'-dirty' if dirty else ''}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    log(f"\nResults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
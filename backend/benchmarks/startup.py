@@ -0,0 +1,44 @@
+import asyncio
+import json
+import time
+
+# === Cold Start Probe ===
+#
+# Run in a fresh interpreter by `python -m benchmarks.run --suite startup`
+# (one process per sample, so nothing is already imported). Prints a JSON
+# object with the seconds spent in each startup phase:
+#   import         `import app.main`
+#   startup        the lifespan startup, i.e. until the app accepts requests
+#   first_request  the first POST /upload-resume/ (plain-text resume)
+#   ready          from process start of the probe until that first response
+
+
+async def serve_first_request(app, timings, started):
+    import httpx
+
+    lifespan_started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings["startup"] = time.perf_counter() - lifespan_started
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            request_started = time.perf_counter()
+            response = await client.post(
+                "/upload-resume/",
+                files={"resume": ("resume.txt", b"Backend developer: Python, FastAPI, PostgreSQL, Docker.")},
+                data={"job_description": "We need a Python developer with FastAPI and Docker experience."},
+            )
+            timings["first_request"] = time.perf_counter() - request_started
+            timings["ready"] = time.perf_counter() - started
+            timings["status"] = response.status_code
+
+
+def probe():
+    started = time.perf_counter()
+    from app.main import app
+    timings = {"import": time.perf_counter() - started}
+    asyncio.run(serve_first_request(app, timings, started))
+    return timings
+
+
+if __name__ == "__main__":
+    print(json.dumps(probe()))